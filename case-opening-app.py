@@ -1,15 +1,16 @@
 import streamlit as st
-import json
 from datetime import datetime, date
 from pathlib import Path
+import os
 import uuid
-from modules.pdf_generator import generate_case_pdf
-from modules.pdf_form_filler import fill_official_form
-from modules.database import CaseDatabase
+from modules.database import CaseDatabase, SQLiteCaseDatabase
 from modules.forms import render_defendant_info, render_case_info, render_court_info
-from modules.utils import format_phone, parse_date
+from modules.utils import format_phone, parse_date, json_dumps
 from modules.auth_ui import check_authentication, show_user_info
 
+# Number of cases rendered per sidebar page
+CASE_LIST_PAGE_SIZE = 50
+
 # Page config
 st.set_page_config(
     page_title="Case Opening Sheet Manager",
@@ -26,16 +27,42 @@ Path("data").mkdir(exist_ok=True)
 Path("exports").mkdir(exist_ok=True)
 Path("exports/pdfs").mkdir(exist_ok=True)
 
-# Initialize database
-db = CaseDatabase("data/cases.json")
-
 # Initialize session state
+if 'db' not in st.session_state:
+    # One instance per session keeps the parsed case index across reruns
+    if os.getenv("CASE_DB_BACKEND", "json").lower() == "sqlite":
+        st.session_state.db = SQLiteCaseDatabase("data/cases.db")
+        # First run on SQLite: carry over the existing JSON cases
+        if not st.session_state.db.get_all_cases() and Path("data/cases.json").exists():
+            st.session_state.db.import_from_json("data/cases.json")
+    else:
+        st.session_state.db = CaseDatabase("data/cases.json")
+db = st.session_state.db
+
 if 'current_case' not in st.session_state:
     st.session_state.current_case = {}
 if 'edit_mode' not in st.session_state:
     st.session_state.edit_mode = False
 if 'selected_case_id' not in st.session_state:
     st.session_state.selected_case_id = None
+if 'case_list_page' not in st.session_state:
+    st.session_state.case_list_page = 0
+
+@st.cache_data(max_entries=64)
+def list_cases(search_term: str, db_version: tuple) -> list:
+    """Cases shown in the sidebar; db_version ties the cache to the files on disk"""
+    return db.search_cases(search_term) if search_term else db.get_all_cases()
+
+def _shallow_owned(case: dict) -> dict:
+    """Copy a case for editing without aliasing the cached row
+    
+    Strings, dates and numbers are immutable and are shared; only mutable
+    containers are copied so the form can't change the cached case.
+    """
+    return {
+        key: value.copy() if isinstance(value, (list, dict, set)) else value
+        for key, value in case.items()
+    }
 
 def clear_form():
     """Clear the current form"""
@@ -87,14 +114,29 @@ with st.sidebar:
     
     # Search functionality
     st.subheader("🔍 Search Cases")
-    search_term = st.text_input("Search by name or case number")
+    # Inside a form the search only reruns the app when submitted (Enter or
+    # the button), not whenever the field loses focus mid-edit
+    with st.form("search_form", border=False):
+        search_term = st.text_input("Search by name or case number", key="search_term")
+        st.form_submit_button("Search", use_container_width=True)
+    
+    # Start from the first page whenever the search changes
+    if st.session_state.get('case_list_search') != search_term:
+        st.session_state.case_list_search = search_term
+        st.session_state.case_list_page = 0
     
     # List cases
-    cases = db.search_cases(search_term) if search_term else db.get_all_cases()
+    cases = list_cases(search_term, db.version())
     
     if cases:
         st.subheader(f"📋 Cases ({len(cases)})")
-        for case in cases:
+        
+        # Only build widgets for the current page of cases
+        page_count = (len(cases) - 1) // CASE_LIST_PAGE_SIZE + 1
+        list_page = min(st.session_state.case_list_page, page_count - 1)
+        page_start = list_page * CASE_LIST_PAGE_SIZE
+        
+        for case in cases[page_start:page_start + CASE_LIST_PAGE_SIZE]:
             defendant_name = f"{case.get('last_name', '')}, {case.get('first_name', '')}"
             case_number = case.get('case_number', 'No case #')
             
@@ -105,7 +147,7 @@ with st.sidebar:
                     key=f"case_{case['id']}",
                     use_container_width=True
                 ):
-                    st.session_state.current_case = case.copy()
+                    st.session_state.current_case = _shallow_owned(case)
                     st.session_state.edit_mode = True
                     st.session_state.selected_case_id = case['id']
                     st.rerun()
@@ -116,6 +158,22 @@ with st.sidebar:
                     if st.session_state.selected_case_id == case['id']:
                         clear_form()
                     st.rerun()
+        
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("◀", key="case_list_prev", disabled=list_page == 0):
+                    st.session_state.case_list_page = list_page - 1
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {list_page + 1} of {page_count}")
+            with col3:
+                if st.button("▶", key="case_list_next", disabled=list_page == page_count - 1):
+                    st.session_state.case_list_page = list_page + 1
+                    st.rerun()
+            
+            if search_term:
+                st.caption("Refine your search to narrow the list")
 
 # Main content area based on selected page
 if page == "📝 Case Management":
@@ -125,112 +183,114 @@ if page == "📝 Case Management":
     # Navigation shortcuts at the top
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-    if st.button("👤 Defendant Info", use_container_width=True):
-        st.session_state.scroll_to = "defendant"
-with col2:
-    if st.button("📋 Case Details", use_container_width=True):
-        st.session_state.scroll_to = "case"
-with col3:
-    if st.button("🏛️ Court Info", use_container_width=True):
-        st.session_state.scroll_to = "court"
-with col4:
-    if st.button("📄 Export/View", use_container_width=True):
-        st.session_state.scroll_to = "export"
+        if st.button("👤 Defendant Info", use_container_width=True):
+            st.session_state.scroll_to = "defendant"
+    with col2:
+        if st.button("📋 Case Details", use_container_width=True):
+            st.session_state.scroll_to = "case"
+    with col3:
+        if st.button("🏛️ Court Info", use_container_width=True):
+            st.session_state.scroll_to = "court"
+    with col4:
+        if st.button("📄 Export/View", use_container_width=True):
+            st.session_state.scroll_to = "export"
 
-st.divider()
+    st.divider()
 
-# All forms on one page
-# Defendant Information Section
-st.markdown('<div id="defendant"></div>', unsafe_allow_html=True)
-render_defendant_info(st.session_state.current_case)
+    # All forms on one page
+    # Defendant Information Section
+    st.markdown('<div id="defendant"></div>', unsafe_allow_html=True)
+    render_defendant_info(st.session_state.current_case)
 
-st.divider()
+    st.divider()
 
-# Case Details Section
-st.markdown('<div id="case"></div>', unsafe_allow_html=True)
-render_case_info(st.session_state.current_case)
+    # Case Details Section
+    st.markdown('<div id="case"></div>', unsafe_allow_html=True)
+    render_case_info(st.session_state.current_case)
 
-st.divider()
+    st.divider()
 
-# Court Information Section
-st.markdown('<div id="court"></div>', unsafe_allow_html=True)
-render_court_info(st.session_state.current_case)
+    # Court Information Section
+    st.markdown('<div id="court"></div>', unsafe_allow_html=True)
+    render_court_info(st.session_state.current_case)
 
-st.divider()
+    st.divider()
 
-# Export/View Section
-st.markdown('<div id="export"></div>', unsafe_allow_html=True)
-st.header("📄 Export and View")
+    # Export/View Section
+    st.markdown('<div id="export"></div>', unsafe_allow_html=True)
+    st.header("📄 Export and View")
 
-col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
 
-with col1:
-    st.subheader("Actions")
+    with col1:
+        st.subheader("Actions")
     
-    # Save button
-    if st.button("💾 Save Case", use_container_width=True, type="primary"):
-        saved_case = save_case()
-        st.success(f"✅ Case saved: {saved_case.get('case_number', 'New Case')}")
+        # Save button
+        if st.button("💾 Save Case", use_container_width=True, type="primary"):
+            saved_case = save_case()
+            st.success(f"✅ Case saved: {saved_case.get('case_number', 'New Case')}")
     
-    # PDF Export Options
-    st.markdown("### 📄 PDF Export Options")
+        # PDF Export Options
+        st.markdown("### 📄 PDF Export Options")
     
-    # Option 1: Custom PDF Report
-    if st.button("📄 Generate Custom PDF Report", use_container_width=True):
-        if st.session_state.current_case:
-            pdf_path = generate_case_pdf(st.session_state.current_case)
-            
-            # Offer download
-            with open(pdf_path, 'rb') as f:
+        # Option 1: Custom PDF Report
+        if st.button("📄 Generate Custom PDF Report", use_container_width=True):
+            if st.session_state.current_case:
+                # ReportLab and PyPDF2 are slow to import and most sessions
+                # never export, so the PDF modules load on first use
+                from modules.pdf_generator import generate_case_pdf_bytes
+                pdf_name, pdf_bytes = generate_case_pdf_bytes(st.session_state.current_case)
+                
+                # Offer download
                 st.download_button(
                     label="⬇️ Download Custom Report",
-                    data=f,
-                    file_name=Path(pdf_path).name,
+                    data=pdf_bytes,
+                    file_name=pdf_name,
                     mime="application/pdf",
                     key="download_custom"
                 )
+        
+        # Option 2: Fill Official Form
+        if st.button("📋 Fill Official Case Opening Form", use_container_width=True):
+            if st.session_state.current_case:
+                try:
+                    # Check if template exists
+                    template_path = "CASE OPENING SHEET.pdf"
+                    if not Path(template_path).exists():
+                        st.error(f"Template file '{template_path}' not found. Please ensure it's in the root directory.")
+                    else:
+                        from modules.pdf_form_filler import fill_official_form
+                        pdf_path = fill_official_form(st.session_state.current_case, template_path)
+                        
+                        # Offer download
+                        with open(pdf_path, 'rb') as f:
+                            st.download_button(
+                                label="⬇️ Download Official Form",
+                                data=f,
+                                file_name=Path(pdf_path).name,
+                                mime="application/pdf",
+                                key="download_official"
+                            )
+                except Exception as e:
+                    st.error(f"Error filling form: {str(e)}")
+        
+        # Export all data
+        if st.button("📊 Export All Cases (JSON)", use_container_width=True):
+            json_data = json_dumps(db.get_all_cases(), indent=True)
+            
+            st.download_button(
+                label="⬇️ Download All Cases",
+                data=json_data,
+                file_name=f"cases_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
     
-    # Option 2: Fill Official Form
-    if st.button("📋 Fill Official Case Opening Form", use_container_width=True):
+    with col2:
+        st.subheader("Current Case Data")
         if st.session_state.current_case:
-            try:
-                # Check if template exists
-                template_path = "CASE OPENING SHEET.pdf"
-                if not Path(template_path).exists():
-                    st.error(f"Template file '{template_path}' not found. Please ensure it's in the root directory.")
-                else:
-                    pdf_path = fill_official_form(st.session_state.current_case, template_path)
-                    
-                    # Offer download
-                    with open(pdf_path, 'rb') as f:
-                        st.download_button(
-                            label="⬇️ Download Official Form",
-                            data=f,
-                            file_name=Path(pdf_path).name,
-                            mime="application/pdf",
-                            key="download_official"
-                        )
-            except Exception as e:
-                st.error(f"Error filling form: {str(e)}")
-    
-    # Export all data
-    if st.button("📊 Export All Cases (JSON)", use_container_width=True):
-        all_cases = db.get_all_cases()
-        json_data = json.dumps(all_cases, indent=2)
-        
-        st.download_button(
-            label="⬇️ Download All Cases",
-            data=json_data,
-            file_name=f"cases_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json"
-        )
-
-with col2:
-    st.subheader("Current Case Data")
-    if st.session_state.current_case:
-        st.json(st.session_state.current_case)
-    else:
-        st.info("No case data to display. Fill out the form to see the data structure.")
+            st.json(st.session_state.current_case)
+        else:
+            st.info("No case data to display. Fill out the form to see the data structure.")
 
 # Settings page
 if page == "⚙️ Settings":
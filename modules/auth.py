@@ -5,17 +5,26 @@ Implements email verification, time-limited PIN codes, JWT tokens, and domain re
 import hashlib
 import hmac
 import base64
+import re
 import json
 import secrets
 import time
 import smtplib
+import sqlite3
 import os
+import tempfile
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional, Dict, Tuple
 import streamlit as st
 from modules.secure_credentials import SecureCredentialManager
+from modules.utils import json_dumps, json_loads
 
 # Load environment variables from .env file if it exists
 try:
@@ -28,47 +37,462 @@ except ImportError:
     # dotenv not installed, environment variables must be set manually
     pass
 
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:
+    # argon2-cffi is optional; new hashes fall back to PBKDF2
+    PasswordHasher = None
+
+logger = logging.getLogger(__name__)
+
+# PBKDF2 work factor for new password hashes when argon2 is not installed
+PASSWORD_HASH_ITERATIONS = 200_000
+
+# Argon2id hasher for new password hashes; it stores its own salt in the hash
+_password_hasher = (
+    PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1) if PasswordHasher else None
+)
+
+# The JWT header never changes, so it is encoded once
+_JWT_HEADER_ENCODED = base64.urlsafe_b64encode(
+    json.dumps({"alg": "HS256", "typ": "JWT"}).encode()
+).rstrip(b'=')
+
+# Six-digit PIN or verification code in an outgoing email, shown on screen in mock mode
+_EMAIL_CODE_RE = re.compile(r'(?:PIN is|code is|Code):\s*(\d{6})')
+
+# Seconds between sweeps of expired pending users and PINs
+CLEANUP_INTERVAL = 60
+
+# pins file path -> time.monotonic() of the last sweep
+_last_cleanup: Dict[str, float] = {}
+
+# users.json (or auth.db) paths whose storage has been set up this process
+_initialized_storage = set()
+
+# Parsed JSON files shared by every AuthManager, keyed by absolute path and
+# validated against the file's stat, so unchanged files are not re-read
+_json_cache: Dict[str, tuple] = {}
+
+# users.json path -> (cached users dict, {user id: user key}), rebuilt
+# whenever the cached users dict is replaced
+_user_id_index: Dict[str, tuple] = {}
+
+def _stat_key(file_path: str) -> Optional[tuple]:
+    """Identify the current version of a file on disk"""
+    try:
+        st_ = os.stat(file_path)
+    except OSError:
+        return None
+    return (st_.st_ino, st_.st_mtime_ns, st_.st_size)
+
+def _now_ms() -> int:
+    """Current Unix time in whole milliseconds, as stored in expiry fields"""
+    # Integer nanoseconds avoid the rounding of time.time() * 1000
+    return time.time_ns() // 1_000_000
+
+@lru_cache(maxsize=None)
+def sha_extensions_available() -> Optional[bool]:
+    """Whether the CPU has SHA-256 instructions; None when that cannot be told"""
+    # PBKDF2 and the JWT HMAC run several times slower without them. Read
+    # from /proc/cpuinfo once instead of benchmarking at startup
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith(('flags', 'Features')):
+                    # x86 reports sha_ni, ARM reports sha2
+                    flags = line.partition(':')[2].split()
+                    available = 'sha_ni' in flags or 'sha2' in flags
+                    if not available:
+                        logger.warning(
+                            "CPU has no SHA-256 instructions; password hashing and "
+                            "token checks will run in software"
+                        )
+                    return available
+    except OSError:
+        pass
+    return None
+
+def _codes_match(expected, given) -> bool:
+    """Compare a stored code with user input in constant time"""
+    # Compared as bytes, since compare_digest rejects non-ASCII strings
+    return hmac.compare_digest(str(expected or '').encode(), str(given or '').encode())
+
+def _copy_records(data: dict) -> dict:
+    """Copy a dict of records deep enough that callers can edit it freely"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in data.items()}
+
+# Most idle authenticated SMTP connections kept for reuse
+SMTP_POOL_SIZE = 4
+
+# Idle authenticated SMTP connections, oldest first, as
+# ((server, port, username, password), smtplib.SMTP)
+_smtp_pool: list = []
+_smtp_lock = threading.Lock()
+
+def _close_smtp():
+    """Close every idle pooled SMTP connection"""
+    with _smtp_lock:
+        idle = _smtp_pool[:]
+        _smtp_pool.clear()
+    for _, connection in idle:
+        try:
+            connection.quit()
+        except Exception:
+            pass
+
+atexit.register(_close_smtp)
+
+# Background senders, so requests do not wait on the SMTP round trips
+_email_executor = ThreadPoolExecutor(max_workers=SMTP_POOL_SIZE, thread_name_prefix='auth-email')
+
+def _log_email_failure(future: Future):
+    """Log a background email that could not be sent"""
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Failed to send email in the background: {error}")
+
+def _smtp_try_send(connection: smtplib.SMTP, username: str, to_email: str, message: str) -> bool:
+    """Send on a connection; False if the server had dropped it, which is then closed"""
+    try:
+        connection.sendmail(username, to_email, message)
+        return True
+    except (smtplib.SMTPServerDisconnected, ConnectionError):
+        connection.close()
+        return False
+    except Exception:
+        connection.close()
+        raise
+
+def _smtp_sendmail(server: str, port: int, username: str, password: str, to_email: str, message: str):
+    """Send an email over a pooled connection, reconnecting if the server dropped it"""
+    key = (server, port, username, password)
+    connection = None
+    with _smtp_lock:
+        for i in range(len(_smtp_pool) - 1, -1, -1):
+            if _smtp_pool[i][0] == key:
+                connection = _smtp_pool.pop(i)[1]
+                break
+        
+    # Sending happens outside the lock, so several emails can go out at once
+    if connection is None or not _smtp_try_send(connection, username, to_email, message):
+        # No idle connection, or the server closed it; open a new one
+        connection = smtplib.SMTP(server, port)
+        try:
+            connection.starttls()
+            connection.login(username, password)
+        except Exception:
+            connection.close()
+            raise
+        if not _smtp_try_send(connection, username, to_email, message):
+            raise smtplib.SMTPServerDisconnected("Connection closed while sending")
+
+    with _smtp_lock:
+        _smtp_pool.append((key, connection))
+        evicted = _smtp_pool.pop(0)[1] if len(_smtp_pool) > SMTP_POOL_SIZE else None
+    if evicted is not None:
+        try:
+            evicted.quit()
+        except Exception:
+            pass
+
+class SQLiteAuthStore:
+    """SQLite storage for users, pending registrations and login PINs
+    
+    Each JSON file becomes a table of (key, record JSON) rows, so a save only
+    writes the records that changed instead of rewriting the whole file.
+    """
+    
+    TABLES = ('users', 'pending_users', 'login_pins')
+    
+    def __init__(self, db_path: str = "data/auth.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        # One connection per store, shared by Streamlit's script threads
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # table -> (PRAGMA data_version when read, records)
+        self._cache: Dict[str, tuple] = {}
+        
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for table in self.TABLES:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, data TEXT NOT NULL)"
+                )
+    
+    def _load(self, table: str) -> tuple:
+        """Read a table unless the cached copy is current; returns (version, records)"""
+        # data_version only changes when another connection commits
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        cached = self._cache.get(table)
+        if cached and cached[0] == version:
+            return cached
+        
+        records = {key: json_loads(data) for key, data in self._conn.execute(f"SELECT key, data FROM {table}")}
+        self._cache[table] = (version, records)
+        return self._cache[table]
+    
+    def read(self, table: str) -> dict:
+        """All records of a table; the result must not be modified"""
+        with self._lock:
+            return self._load(table)[1]
+    
+    def save(self, table: str, data: dict):
+        """Write the records that differ from the last read of the table"""
+        self.save_tables({table: data})
+    
+    def save_tables(self, tables: Dict[str, dict]):
+        """Write the changed records of several tables in one transaction"""
+        with self._lock:
+            writes = []
+            for table, data in tables.items():
+                version, previous = self._cache.get(table) or self._load(table)
+                changed = [
+                    (key, json_dumps(record).decode()) for key, record in data.items()
+                    if previous.get(key) != record
+                ]
+                removed = [(key,) for key in previous if key not in data]
+                writes.append((table, version, data, changed, removed))
+            
+            with self._conn:
+                for table, _, _, changed, removed in writes:
+                    if changed:
+                        self._conn.executemany(
+                            f"INSERT INTO {table} (key, data) VALUES (?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                            changed
+                        )
+                    if removed:
+                        self._conn.executemany(f"DELETE FROM {table} WHERE key = ?", removed)
+            
+            # Keep the version seen at read time, so commits made by other
+            # processes since then still trigger a reload
+            for table, version, data, _, _ in writes:
+                self._cache[table] = (version, _copy_records(data))
+    
+    def delete_expired(self, table: str, expiry_field: str, now_ms: int) -> int:
+        """Delete records whose expiry is before now_ms; returns the number deleted"""
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    f"DELETE FROM {table} WHERE coalesce(json_extract(data, '$.{expiry_field}'), 0) < ?",
+                    (now_ms,)
+                ).rowcount
+            if deleted:
+                # Our own commits do not change data_version, so reload explicitly
+                self._cache.pop(table, None)
+            return deleted
+    
+    def import_from_json(self, table: str, file_path: str) -> int:
+        """Copy records from a JSON store into an empty table; returns the number imported"""
+        if self.read(table) or not os.path.exists(file_path):
+            return 0
+        try:
+            with open(file_path, 'rb') as f:
+                data = json_loads(f.read())
+        except ValueError:
+            return 0
+        if not isinstance(data, dict):
+            return 0
+        self.save(table, data)
+        return len(data)
+
+# Auth database path -> SQLiteAuthStore shared by every AuthManager
+_auth_stores: Dict[str, SQLiteAuthStore] = {}
+
+def _get_auth_store(db_path: str) -> SQLiteAuthStore:
+    """Shared store for an auth database, opened on first use"""
+    key = os.path.abspath(db_path)
+    store = _auth_stores.get(key)
+    if store is None:
+        store = _auth_stores[key] = SQLiteAuthStore(db_path)
+    return store
+
 
 class AuthManager:
     """Handles authentication for the Case Opening Sheet Manager"""
     
     def __init__(self):
-        self.allowed_domains = ['@pd15.org', '@pd15.state.fl.us']
+        self.allowed_domains = ('@pd15.org', '@pd15.state.fl.us')
+        # Lowercased once so domain checks are a single endswith call
+        self._domain_suffixes = tuple(domain.lower() for domain in self.allowed_domains)
         self.jwt_secret = os.environ.get('JWT_SECRET', 'case-opening-jwt-secret-key')
+        # (secret, keyed HMAC-SHA256 state), built on first use by _sign_jwt
+        self._jwt_hmac = None
         self.users_file = 'data/users.json'
         self.pending_users_file = 'data/pending_users.json'
         self.pins_file = 'data/login_pins.json'
+        self.auth_db_file = 'data/auth.db'
+        
+        # Logged once per process if hashing lacks CPU support
+        sha_extensions_available()
         
         # Ensure data directory exists
         import pathlib
         pathlib.Path('data').mkdir(exist_ok=True)
         
+        # Optional SQLite storage in place of the JSON files
+        self.store = None
+        if os.environ.get('AUTH_DB_BACKEND', 'json').lower() == 'sqlite':
+            self.store = _get_auth_store(self.auth_db_file)
+        
         # Initialize files if they don't exist
         self._initialize_storage()
     
     def _initialize_storage(self):
         """Initialize storage files if they don't exist"""
+        # auth_ui builds an AuthManager on every rerun; the files only need
+        # creating once per process, and a file deleted later still loads as {}
+        storage_key = os.path.abspath(self.auth_db_file if self.store is not None else self.users_file)
+        if storage_key in _initialized_storage:
+            return
+        
         for file_path in [self.users_file, self.pending_users_file, self.pins_file]:
-            if not os.path.exists(file_path):
-                with open(file_path, 'w') as f:
-                    json.dump({}, f)
+            if self.store is not None:
+                # First run on SQLite: carry over the existing JSON records
+                self.store.import_from_json(self._table(file_path), file_path)
+                continue
+            try:
+                with open(file_path, 'xb') as f:
+                    f.write(json_dumps({}))
+            except FileExistsError:
+                pass
+        _initialized_storage.add(storage_key)
     
-    def _load_json(self, file_path: str) -> dict:
-        """Load JSON data from file"""
+    def _table(self, file_path: str) -> str:
+        """SQLite table holding the records of a JSON store"""
+        return os.path.splitext(os.path.basename(file_path))[0]
+    
+    def _read_json(self, file_path: str) -> dict:
+        """Load JSON data through the shared cache; the result must not be modified"""
+        if self.store is not None:
+            return self.store.read(self._table(file_path))
+        
+        cache_key = os.path.abspath(file_path)
+        stat_key = _stat_key(file_path)
+        cached = _json_cache.get(cache_key)
+        if cached and stat_key is not None and cached[0] == stat_key:
+            return cached[1]
+        
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(file_path, 'rb') as f:
+                data = json_loads(f.read())
+        except (FileNotFoundError, ValueError):
             return {}
+        
+        if stat_key is not None and isinstance(data, dict):
+            _json_cache[cache_key] = (stat_key, data)
+        return data
+    
+    def _load_json(self, file_path: str) -> dict:
+        """Load JSON data from file"""
+        data = self._read_json(file_path)
+        return _copy_records(data) if isinstance(data, dict) else data
     
     def _save_json(self, file_path: str, data: dict):
         """Save JSON data to file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        if self.store is not None:
+            self.store.save(self._table(file_path), data)
+            return
+        
+        # users.json stays indented for admins reading it; PINs and pending
+        # registrations are rewritten constantly, so they are kept compact
+        pretty = file_path == self.users_file
+        
+        # Swap in a complete file, so a concurrent reader never parses a
+        # truncated one and saves it back as empty. Each save gets its own
+        # temporary file, so concurrent saves cannot replace each other's
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                        prefix=os.path.basename(file_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_dumps(data, indent=pretty))
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        
+        stat_key = _stat_key(file_path)
+        if stat_key is not None:
+            _json_cache[os.path.abspath(file_path)] = (stat_key, _copy_records(data))
+    
+    def _save_stores(self, *updates: Tuple[str, dict]):
+        """Save several (file path, data) pairs in order; one transaction on SQLite"""
+        if self.store is not None:
+            self.store.save_tables({self._table(file_path): data for file_path, data in updates})
+            return
+        
+        for file_path, data in updates:
+            self._save_json(file_path, data)
+    
+    def _user_key(self, email: str) -> str:
+        """Key of a user's record in users.json; users are stored under their email"""
+        return f"user:{email.lower()}"
+    
+    def _find_user_by_id(self, user_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Key and cached record of the user with this id; the record must not be modified"""
+        users = self._read_json(self.users_file)
+        index_key = os.path.abspath(self.users_file)
+        cached = _user_id_index.get(index_key)
+        if cached and cached[0] is users:
+            by_id = cached[1]
+        else:
+            by_id = {user.get('id'): key for key, user in users.items()}
+            _user_id_index[index_key] = (users, by_id)
+        
+        user_key = by_id.get(user_id)
+        return user_key, users.get(user_key)
     
     def _hash_password(self, password: str, salt: str) -> str:
-        """Hash password with salt using SHA-256"""
-        return hashlib.sha256((password + salt).encode()).hexdigest()
+        """Hash password with Argon2id, or with salt using PBKDF2-HMAC-SHA256"""
+        if _password_hasher is not None:
+            return _password_hasher.hash(password)
+        digest = hashlib.pbkdf2_hmac(
+            'sha256', password.encode(), salt.encode(), PASSWORD_HASH_ITERATIONS
+        )
+        return f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}${digest.hex()}"
+    
+    def _verify_password(self, password: str, salt: str, stored_hash: str) -> bool:
+        """Check a password against a stored hash in constant time"""
+        if stored_hash.startswith('$argon2'):
+            if _password_hasher is None:
+                logger.error("Password hash needs argon2-cffi, which is not installed")
+                return False
+            try:
+                return _password_hasher.verify(stored_hash, password)
+            except (InvalidHashError, VerificationError):
+                return False
+        try:
+            if stored_hash.startswith('pbkdf2_sha256$'):
+                _, iterations, expected = stored_hash.split('$')
+                digest = hashlib.pbkdf2_hmac(
+                    'sha256', password.encode(), salt.encode(), int(iterations)
+                )
+            else:
+                # Accounts created before PBKDF2 store a bare SHA-256 hex digest
+                # of password + salt; fed in two parts to skip the concatenation
+                expected = stored_hash
+                hasher = hashlib.sha256(password.encode())
+                hasher.update(salt.encode())
+                digest = hasher.digest()
+            # Raw digests are compared, so nothing is hex-encoded per attempt
+            return hmac.compare_digest(digest, bytes.fromhex(expected))
+        except ValueError:
+            return False
+    
+    def _needs_rehash(self, stored_hash: str) -> bool:
+        """Whether a stored hash predates the current hashing settings"""
+        if _password_hasher is not None:
+            return (not stored_hash.startswith('$argon2id$')
+                    or _password_hasher.check_needs_rehash(stored_hash))
+        return not stored_hash.startswith(f"pbkdf2_sha256${PASSWORD_HASH_ITERATIONS}$")
     
     def _generate_salt(self) -> str:
         """Generate random salt"""
@@ -76,15 +500,19 @@ class AuthManager:
     
     def _generate_pin(self) -> str:
         """Generate 6-digit PIN"""
-        return str(secrets.randbelow(900000) + 100000)
+        # All of 000000-999999, zero-padded to six digits
+        return f"{secrets.randbelow(1_000_000):06d}"
     
     def _is_allowed_email_domain(self, email: str) -> bool:
         """Check if email domain is allowed"""
-        email_lower = email.lower()
-        return any(email_lower.endswith(domain) for domain in self.allowed_domains)
+        return email.lower().endswith(self._domain_suffixes)
     
-    def _send_email(self, to_email: str, subject: str, message: str) -> bool:
-        """Send email using organization's Outlook/Office365 SMTP server"""
+    def _send_email(self, to_email: str, subject: str, message: str, wait: bool = True) -> bool:
+        """Send email using organization's Outlook/Office365 SMTP server
+        
+        With wait=False the SMTP exchange runs in the background and failures
+        are only logged; configuration problems are still reported here.
+        """
         try:
             # Check for development/mock mode
             if os.environ.get('EMAIL_MOCK_MODE', '').lower() == 'true':
@@ -96,8 +524,7 @@ class AuthManager:
                 print(f"==================\n")
                 
                 # Extract PIN/code from message for display
-                import re
-                code_match = re.search(r'(?:PIN is|code is|Code):\s*(\d{6})', message)
+                code_match = _EMAIL_CODE_RE.search(message)
                 if code_match:
                     code = code_match.group(1)
                     st.success(f"📧 **Development Mode**: Email sent to {to_email}")
@@ -149,75 +576,79 @@ class AuthManager:
             
             msg.attach(MIMEText(full_message, 'plain'))
             
-            # Connect and send email
-            server = smtplib.SMTP(smtp_server, smtp_port)
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.sendmail(smtp_username, to_email, msg.as_string())
-            server.quit()
+            # Send over a pooled connection; the TLS handshake and login
+            # only happen when there is no usable connection yet
+            smtp_args = (smtp_server, smtp_port, smtp_username, smtp_password, to_email, msg.as_string())
+            if wait:
+                _smtp_sendmail(*smtp_args)
+            else:
+                _email_executor.submit(_smtp_sendmail, *smtp_args).add_done_callback(_log_email_failure)
             
             return True
         except Exception as e:
             st.error(f"Failed to send verification email. Please contact your system administrator. Error: {str(e)}")
             return False
     
+    def _sign_jwt(self, message: bytes) -> bytes:
+        """HMAC-SHA256 of a JWT message under jwt_secret"""
+        # The keyed HMAC state is built once per secret and copied per token
+        template = self._jwt_hmac
+        if template is None or template[0] != self.jwt_secret:
+            template = (self.jwt_secret, hmac.new(self.jwt_secret.encode(), digestmod=hashlib.sha256))
+            self._jwt_hmac = template
+        signer = template[1].copy()
+        signer.update(message)
+        return signer.digest()
+    
     def _generate_jwt(self, user_id: str) -> str:
         """Generate JWT token"""
-        header = {"alg": "HS256", "typ": "JWT"}
+        now = int(time.time())
         payload = {
             "sub": user_id,
-            "iat": int(time.time()),
-            "exp": int(time.time()) + (24 * 60 * 60)  # 24 hours
+            "iat": now,
+            "exp": now + (24 * 60 * 60)  # 24 hours
         }
         
-        # Encode header and payload
-        header_encoded = base64.urlsafe_b64encode(
-            json.dumps(header).encode()
-        ).decode().rstrip('=')
-        
-        payload_encoded = base64.urlsafe_b64encode(
-            json.dumps(payload).encode()
-        ).decode().rstrip('=')
+        # Everything stays in bytes until the final decode
+        payload_encoded = base64.urlsafe_b64encode(json_dumps(payload)).rstrip(b'=')
+        message = _JWT_HEADER_ENCODED + b'.' + payload_encoded
         
         # Create signature
-        message = f"{header_encoded}.{payload_encoded}"
-        signature = hmac.new(
-            self.jwt_secret.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).digest()
+        signature = self._sign_jwt(message)
         
-        signature_encoded = base64.urlsafe_b64encode(signature).decode().rstrip('=')
+        signature_encoded = base64.urlsafe_b64encode(signature).rstrip(b'=')
         
-        return f"{header_encoded}.{payload_encoded}.{signature_encoded}"
+        return (message + b'.' + signature_encoded).decode()
     
     def _verify_jwt(self, token: str) -> Optional[Dict]:
         """Verify JWT token and return payload if valid"""
         try:
-            parts = token.split('.')
-            if len(parts) != 3:
+            token_bytes = token.encode()
+            if token_bytes.count(b'.') != 2:
                 return None
             
-            header_encoded, payload_encoded, signature_encoded = parts
+            # The signed message is everything before the last dot
+            message, _, signature_encoded = token_bytes.rpartition(b'.')
+            header_encoded, _, payload_encoded = message.partition(b'.')
+            
+            # Only HS256 tokens with our own header are accepted, as PyJWT
+            # does with algorithms=['HS256']; anything else skips the HMAC
+            if header_encoded != _JWT_HEADER_ENCODED:
+                return None
             
             # Verify signature
-            message = f"{header_encoded}.{payload_encoded}"
-            expected_signature = hmac.new(
-                self.jwt_secret.encode(),
-                message.encode(),
-                hashlib.sha256
-            ).digest()
+            expected_signature = self._sign_jwt(message)
             
             # Add padding if needed
-            signature_encoded += '=' * (4 - len(signature_encoded) % 4)
+            signature_encoded += b'=' * (-len(signature_encoded) % 4)
             signature = base64.urlsafe_b64decode(signature_encoded)
             
             if not hmac.compare_digest(signature, expected_signature):
                 return None
             
             # Decode payload
-            payload_encoded += '=' * (4 - len(payload_encoded) % 4)
-            payload = json.loads(base64.urlsafe_b64decode(payload_encoded))
+            payload_encoded += b'=' * (-len(payload_encoded) % 4)
+            payload = json_loads(base64.urlsafe_b64decode(payload_encoded))
             
             # Check expiration
             if payload.get('exp', 0) < time.time():
@@ -229,29 +660,48 @@ class AuthManager:
     
     def _cleanup_expired_data(self):
         """Clean up expired pending users and PINs"""
-        current_time = time.time() * 1000  # Convert to milliseconds
-        
-        # Clean expired pending users
-        pending_users = self._load_json(self.pending_users_file)
-        expired_keys = [
-            key for key, user in pending_users.items()
-            if user.get('codeExpiry', 0) < current_time
-        ]
-        for key in expired_keys:
-            del pending_users[key]
-        if expired_keys:
-            self._save_json(self.pending_users_file, pending_users)
-        
-        # Clean expired PINs
-        pins = self._load_json(self.pins_file)
-        expired_keys = [
-            key for key, pin_data in pins.items()
-            if pin_data.get('expiry', 0) < current_time
-        ]
-        for key in expired_keys:
-            del pins[key]
-        if expired_keys:
-            self._save_json(self.pins_file, pins)
+        # Expiry is also checked wherever a code or PIN is used, so this only
+        # needs to run now and then to keep the files small
+        cleanup_key = os.path.abspath(self.pins_file)
+        now = time.monotonic()
+        if now - _last_cleanup.get(cleanup_key, float('-inf')) < CLEANUP_INTERVAL:
+            return
+        _last_cleanup[cleanup_key] = now
+        
+        current_time = _now_ms()
+        
+        for file_path, expiry_field in (
+            (self.pending_users_file, 'codeExpiry'),
+            (self.pins_file, 'expiry'),
+        ):
+            if self.store is not None:
+                # One DELETE sweeps the table without loading any records
+                self.store.delete_expired(self._table(file_path), expiry_field, current_time)
+                continue
+            
+            # Check the cached copy first so nothing is copied or written
+            # when nothing has expired
+            expired_keys = [
+                key for key, record in self._read_json(file_path).items()
+                if record.get(expiry_field, 0) < current_time
+            ]
+            if expired_keys:
+                data = self._load_json(file_path)
+                for key in expired_keys:
+                    data.pop(key, None)
+                self._save_json(file_path, data)
+    
+    def _load_and_sweep(self, file_path: str, expiry_field: str) -> Tuple[dict, dict]:
+        """Load records and split off expired ones without writing; returns (live, expired)"""
+        current_time = _now_ms()
+        data = self._load_json(file_path)
+        expired = {
+            key: record for key, record in data.items()
+            if record.get(expiry_field, 0) < current_time
+        }
+        for key in expired:
+            del data[key]
+        return data, expired
     
     def register_user(self, email: str, password: str, email_confirm: str) -> Tuple[bool, str]:
         """Register a new user with email verification"""
@@ -263,13 +713,12 @@ class AuthManager:
         
         # Check if email already registered
         users = self._load_json(self.users_file)
-        for user_data in users.values():
-            if user_data.get('email', '').lower() == email.lower():
-                return False, "Email already registered."
+        if self._user_key(email) in users:
+            return False, "Email already registered."
         
         # Generate verification code
         verification_code = self._generate_pin()
-        code_expiry = int(time.time() * 1000) + (10 * 60 * 1000)  # 10 minutes
+        code_expiry = _now_ms() + (10 * 60 * 1000)  # 10 minutes
         
         # Create pending user - use email as username
         salt = self._generate_salt()
@@ -303,31 +752,34 @@ If you did not request this registration, please ignore this email.
 Best regards,
 15th Judicial Circuit Public Defender's Office"""
         
-        if self._send_email(email, subject, message):
+        if self._send_email(email, subject, message, wait=False):
             return True, "Registration successful! Please check your email for a verification code."
         else:
             return False, "Failed to send verification email. Please try again."
     
     def verify_registration(self, email: str, code: str) -> Tuple[bool, str]:
         """Verify user registration with email code"""
-        self._cleanup_expired_data()
-        
-        pending_users = self._load_json(self.pending_users_file)
+        # Expired registrations are dropped in the same load, and the file is
+        # written at most once below
+        pending_users, expired = self._load_and_sweep(self.pending_users_file, 'codeExpiry')
         pending_key = f"pending:{email.lower()}"
         
+        # Check code expiry
+        if pending_key in expired:
+            self._save_json(self.pending_users_file, pending_users)
+            return False, "Verification code has expired. Please register again."
+        
         if pending_key not in pending_users:
+            if expired:
+                self._save_json(self.pending_users_file, pending_users)
             return False, "No pending registration found for this email address."
         
         pending_user = pending_users[pending_key]
         
-        # Check code expiry
-        if pending_user.get('codeExpiry', 0) < time.time() * 1000:
-            del pending_users[pending_key]
-            self._save_json(self.pending_users_file, pending_users)
-            return False, "Verification code has expired. Please register again."
-        
         # Verify code
-        if pending_user.get('verificationCode') != code:
+        if not _codes_match(pending_user.get('verificationCode'), code):
+            if expired:
+                self._save_json(self.pending_users_file, pending_users)
             return False, "Invalid verification code."
         
         # Move user to active users
@@ -343,12 +795,14 @@ Best regards,
         }
         
         users = self._load_json(self.users_file)
-        users[f"user:{email.lower()}"] = user
-        self._save_json(self.users_file, users)
+        users[self._user_key(email)] = user
         
         # Remove from pending
         del pending_users[pending_key]
-        self._save_json(self.pending_users_file, pending_users)
+        
+        # Each file is written once, the account first, so a crash in between
+        # leaves a stale registration rather than a lost account
+        self._save_stores((self.users_file, users), (self.pending_users_file, pending_users))
         
         return True, "Account verified successfully! You can now log in."
     
@@ -357,21 +811,20 @@ Best regards,
         users = self._load_json(self.users_file)
         
         # Find user by email
-        user_found = None
-        user_key = None
-        for key, user in users.items():
-            if user.get('email', '').lower() == email.lower():
-                user_found = user
-                user_key = key
-                break
+        user_key = self._user_key(email)
+        user_found = users.get(user_key)
         
         if not user_found:
             return False, "Invalid email or password.", None
         
         # Verify password
-        if user_found['password'] != self._hash_password(password, user_found['salt']):
+        if not self._verify_password(password, user_found['salt'], user_found['password']):
             return False, "Invalid email or password.", None
         
+        # Upgrade older hashes now that we have the plaintext
+        if self._needs_rehash(user_found['password']):
+            user_found['password'] = self._hash_password(password, user_found['salt'])
+        
         # Update last login
         user_found['lastLogin'] = datetime.now().isoformat()
         users[user_key] = user_found
@@ -384,21 +837,18 @@ Best regards,
     
     def request_login_pin(self, email: str) -> Tuple[bool, str]:
         """Request login PIN for quick access"""
-        users = self._load_json(self.users_file)
+        # Only reads the user, so skip copying the whole users dict
+        users = self._read_json(self.users_file)
         
         # Find user by email
-        user_found = None
-        for user in users.values():
-            if user.get('email', '').lower() == email.lower():
-                user_found = user
-                break
+        user_found = users.get(self._user_key(email))
         
         if not user_found:
             return False, "Email address not found."
         
         # Generate PIN
         pin = self._generate_pin()
-        pin_expiry = int(time.time() * 1000) + (5 * 60 * 1000)  # 5 minutes
+        pin_expiry = _now_ms() + (5 * 60 * 1000)  # 5 minutes
         
         # Save PIN
         pins = self._load_json(self.pins_file)
@@ -417,41 +867,42 @@ This PIN expires in 5 minutes.
 
 If you did not request this PIN, please ignore this email."""
         
-        if self._send_email(user_found['email'], subject, message):
+        if self._send_email(user_found['email'], subject, message, wait=False):
             return True, "PIN sent to your email address."
         else:
             return False, "Failed to send PIN. Please try again."
     
     def verify_login_pin(self, email: str, pin: str) -> Tuple[bool, str, Optional[str]]:
         """Verify login PIN and return JWT token"""
-        self._cleanup_expired_data()
-        
-        pins = self._load_json(self.pins_file)
+        # Expired PINs are dropped in the same load, and the file is written
+        # at most once below
+        pins, expired = self._load_and_sweep(self.pins_file, 'expiry')
         pin_key = f"pin:{email.lower()}"
         
+        # Check expiry
+        if pin_key in expired:
+            self._save_json(self.pins_file, pins)
+            return False, "PIN has expired. Please request a new one.", None
+        
         if pin_key not in pins:
+            if expired:
+                self._save_json(self.pins_file, pins)
             return False, "No PIN request found for this email address.", None
         
         pin_data = pins[pin_key]
         
-        # Check expiry
-        if pin_data.get('expiry', 0) < time.time() * 1000:
-            del pins[pin_key]
-            self._save_json(self.pins_file, pins)
-            return False, "PIN has expired. Please request a new one.", None
-        
         # Verify PIN
-        if pin_data.get('pin') != pin:
+        if not _codes_match(pin_data.get('pin'), pin):
+            if expired:
+                self._save_json(self.pins_file, pins)
             return False, "Invalid PIN.", None
         
         # Update last login
-        users = self._load_json(self.users_file)
-        for user_key, user in users.items():
-            if user['id'] == pin_data['userId']:
-                user['lastLogin'] = datetime.now().isoformat()
-                users[user_key] = user
-                self._save_json(self.users_file, users)
-                break
+        user_key, _ = self._find_user_by_id(pin_data['userId'])
+        if user_key:
+            users = self._load_json(self.users_file)
+            users[user_key]['lastLogin'] = datetime.now().isoformat()
+            self._save_json(self.users_file, users)
         
         # Clean up used PIN
         del pins[pin_key]
@@ -469,14 +920,13 @@ If you did not request this PIN, please ignore this email."""
             return None
         
         # Get user info
-        users = self._load_json(self.users_file)
-        for user in users.values():
-            if user['id'] == payload['sub']:
-                return {
-                    'id': user['id'],
-                    'username': user['username'],
-                    'email': user['email'],
-                    'verified': user['verified']
-                }
-        
-        return None
\ No newline at end of file
+        _, user = self._find_user_by_id(payload['sub'])
+        if user is None:
+            return None
+        
+        return {
+            'id': user['id'],
+            'username': user['username'],
+            'email': user['email'],
+            'verified': user['verified']
+        }
\ No newline at end of file
@@ -1,13 +1,65 @@
 """
 Authentication UI components for Streamlit
 """
+import math
+import time
 import streamlit as st
 from modules.auth import AuthManager
+from modules.secure_credentials import KEY_CACHE_SESSION_KEY
+from modules.ratelimit import SlidingWindow
+
+# Seconds a verified token is trusted across reruns before it is checked again
+TOKEN_RECHECK_SECONDS = 60
+
+# Session keys dropped at logout, including the SMTP credentials held in
+# memory and the keys derived to decrypt them
+LOGOUT_CLEARED_KEYS = (
+    'auth_token_checked', 'pin_requested', 'pin_email_stored',
+    'smtp_unlocked', 'smtp_username', 'smtp_password', KEY_CACHE_SESSION_KEY,
+)
+
+
+@st.cache_resource
+def get_auth_manager() -> AuthManager:
+    """One AuthManager for the whole server instead of one per rerun"""
+    return AuthManager()
+
+
+@st.cache_resource
+def get_rate_limits() -> dict:
+    """Per-email limits on the emailing and code-checking forms, shared by every session"""
+    return {
+        'pin_request': SlidingWindow(3, 300),
+        'pin_verify': SlidingWindow(5, 60),
+        'registration_verify': SlidingWindow(5, 60),
+        'login': SlidingWindow(5, 300),
+    }
+
+
+def _client_ip() -> str:
+    """Address of the browser for this session, or 'unknown' when Streamlit cannot tell"""
+    # st.context.ip_address is missing from older Streamlit releases
+    return getattr(getattr(st, 'context', None), 'ip_address', None) or 'unknown'
+
+
+def _limit_key(email: str, client: str = '') -> str:
+    """Rate limit key for an email, optionally scoped to a client address"""
+    email = email.strip().lower()
+    return f"{client} {email}" if client else email
+
+
+def _rate_limited(limit: str, email: str, client: str = '') -> bool:
+    """Show an error and return True if email has used up its attempts"""
+    wait = get_rate_limits()[limit].retry_after(_limit_key(email, client))
+    if wait:
+        st.error(f"Too many attempts. Please wait {math.ceil(wait)} seconds and try again.")
+        return True
+    return False
 
 
 def show_login_page():
     """Display login/registration page"""
-    auth = AuthManager()
+    auth = get_auth_manager()
     
     st.markdown("""
     <div style='text-align: center; padding: 2rem 0;'>
@@ -37,7 +89,7 @@ def show_login_form(auth: AuthManager):
     """Display email + password login form"""
     st.header("🔑 Email + Password Login")
     
-    with st.form("login_form"):
+    with st.form("login_form", clear_on_submit=True):
         email = st.text_input("Email Address", placeholder="your.name@pd15.org", key="login_email")
         password = st.text_input("Password", type="password", key="login_password")
         
@@ -48,9 +100,18 @@ def show_login_form(auth: AuthManager):
                 st.error("Please enter both email and password.")
                 return
             
-            success, message, token = auth.authenticate_user(email, password)
+            # Checked before the password is hashed, so guessing costs no CPU
+            client = _client_ip()
+            if _rate_limited('login', email, client):
+                return
+            
+            # Each session's script runs in its own thread and the password
+            # hash releases the GIL, so other users are not held up meanwhile
+            with st.spinner("Signing in..."):
+                success, message, token = auth.authenticate_user(email, password)
             
             if success:
+                get_rate_limits()['login'].reset(_limit_key(email, client))
                 st.session_state.auth_token = token
                 st.session_state.authenticated = True
                 st.success(message)
@@ -64,11 +125,10 @@ def show_pin_login_form(auth: AuthManager):
     st.header("📱 Quick PIN Login")
     st.info("Enter your email address to receive a 6-digit PIN")
     
-    # PIN request form
-    if 'pin_requested' not in st.session_state:
-        st.session_state.pin_requested = False
+    session = st.session_state
     
-    if not st.session_state.pin_requested:
+    # PIN request form
+    if not session.setdefault('pin_requested', False):
         with st.form("pin_request_form"):
             email = st.text_input("Email Address", placeholder="your.name@pd15.org", key="pin_email")
             
@@ -79,11 +139,14 @@ def show_pin_login_form(auth: AuthManager):
                     st.error("Please enter your email address.")
                     return
                 
+                if _rate_limited('pin_request', email):
+                    return
+                
                 success, message = auth.request_login_pin(email)
                 
                 if success:
-                    st.session_state.pin_requested = True
-                    st.session_state.pin_email_stored = email
+                    session.pin_requested = True
+                    session.pin_email_stored = email
                     st.success(message)
                     
                     # In mock mode, add a brief delay so user can see the PIN
@@ -105,7 +168,7 @@ def show_pin_login_form(auth: AuthManager):
         if os.environ.get('EMAIL_MOCK_MODE', '').lower() == 'true':
             st.info("💡 **Development Mode**: The PIN was displayed above when you requested it")
         
-        with st.form("pin_verify_form"):
+        with st.form("pin_verify_form", clear_on_submit=True):
             pin = st.text_input("Enter 6-digit PIN from email", key="verify_pin", max_chars=6)
             
             col1, col2 = st.columns(2)
@@ -113,9 +176,9 @@ def show_pin_login_form(auth: AuthManager):
                 submit = st.form_submit_button("Verify PIN", use_container_width=True, type="primary")
             with col2:
                 if st.form_submit_button("Request New PIN", use_container_width=True):
-                    st.session_state.pin_requested = False
-                    if 'pin_email_stored' in st.session_state:
-                        del st.session_state.pin_email_stored
+                    session.pin_requested = False
+                    if 'pin_email_stored' in session:
+                        del session.pin_email_stored
                     st.rerun()
             
             if submit:
@@ -123,16 +186,19 @@ def show_pin_login_form(auth: AuthManager):
                     st.error("Please enter the PIN.")
                     return
                 
+                if _rate_limited('pin_verify', session.pin_email_stored):
+                    return
+                
                 success, message, token = auth.verify_login_pin(
-                    st.session_state.pin_email_stored, pin
+                    session.pin_email_stored, pin
                 )
                 
                 if success:
-                    st.session_state.auth_token = token
-                    st.session_state.authenticated = True
-                    st.session_state.pin_requested = False
-                    if 'pin_email_stored' in st.session_state:
-                        del st.session_state.pin_email_stored
+                    session.auth_token = token
+                    session.authenticated = True
+                    session.pin_requested = False
+                    if 'pin_email_stored' in session:
+                        del session.pin_email_stored
                     st.success(message)
                     st.rerun()
                 else:
@@ -144,7 +210,7 @@ def show_registration_form(auth: AuthManager):
     st.header("📝 Create Account")
     st.warning("⚠️ Only @pd15.org and @pd15.state.fl.us email addresses are allowed")
     
-    with st.form("registration_form"):
+    with st.form("registration_form", clear_on_submit=True):
         email = st.text_input(
             "Email Address", 
             placeholder="your.name@pd15.org",
@@ -196,7 +262,7 @@ def show_verification_form(auth: AuthManager):
     st.header("✅ Verify Account")
     st.info("Enter the 6-digit verification code sent to your email")
     
-    with st.form("verification_form"):
+    with st.form("verification_form", clear_on_submit=True):
         email = st.text_input("Email Address", key="verify_email", help="Enter the email address you registered with")
         verification_code = st.text_input("Verification Code", key="verification_code", max_chars=6, help="6-digit code from email")
         
@@ -207,6 +273,9 @@ def show_verification_form(auth: AuthManager):
                 st.error("Please enter both email address and verification code.")
                 return
             
+            if _rate_limited('registration_verify', email):
+                return
+            
             success, message = auth.verify_registration(email, verification_code)
             
             if success:
@@ -218,31 +287,41 @@ def show_verification_form(auth: AuthManager):
 
 def check_authentication():
     """Check if user is authenticated and handle authentication flow"""
-    # Initialize session state
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
+    # Runs on every rerun, so session state is bound once and each key read once
+    session = st.session_state
     
-    if 'auth_token' not in st.session_state:
-        st.session_state.auth_token = None
+    # Initialize session state
+    authenticated = session.setdefault('authenticated', False)
+    token = session.setdefault('auth_token', None)
     
     # If not authenticated, show login page
-    if not st.session_state.authenticated:
+    if not authenticated:
         show_login_page()
         return False
     
     # If authenticated, verify token is still valid
-    if st.session_state.auth_token:
-        auth = AuthManager()
-        user_info = auth.verify_token(st.session_state.auth_token)
+    if token:
+        # Every widget interaction reruns the script, so a recent successful
+        # check of this same token is reused instead of verifying it again
+        now = time.monotonic()
+        checked = session.get('auth_token_checked')
+        if (checked and checked[0] == token
+                and now - checked[1] < TOKEN_RECHECK_SECONDS
+                and session.get('user_info')):
+            return True
+        
+        auth = get_auth_manager()
+        user_info = auth.verify_token(token)
         
         if user_info:
             # Store user info in session state
-            st.session_state.user_info = user_info
+            session.user_info = user_info
+            session.auth_token_checked = (token, now)
             return True
         else:
             # Token expired or invalid
-            st.session_state.authenticated = False
-            st.session_state.auth_token = None
+            session.authenticated = False
+            session.auth_token = None
             st.error("Your session has expired. Please log in again.")
             st.rerun()
     
@@ -251,9 +330,9 @@ def check_authentication():
 
 def show_user_info():
     """Display user info and logout button in sidebar"""
-    if st.session_state.get('authenticated') and st.session_state.get('user_info'):
-        user_info = st.session_state.user_info
-        
+    session = st.session_state
+    user_info = session.get('user_info')
+    if session.get('authenticated') and user_info:
         with st.sidebar:
             st.divider()
             st.markdown("### 👤 User Info")
@@ -262,20 +341,11 @@ def show_user_info():
             
             if st.button("🚪 Logout", use_container_width=True):
                 # Clear session state
-                st.session_state.authenticated = False
-                st.session_state.auth_token = None
-                st.session_state.user_info = None
-                if 'pin_requested' in st.session_state:
-                    del st.session_state.pin_requested
-                if 'pin_email_stored' in st.session_state:
-                    del st.session_state.pin_email_stored
-                # Clear SMTP credentials from memory
-                if 'smtp_unlocked' in st.session_state:
-                    del st.session_state.smtp_unlocked
-                if 'smtp_username' in st.session_state:
-                    del st.session_state.smtp_username
-                if 'smtp_password' in st.session_state:
-                    del st.session_state.smtp_password
+                session.authenticated = False
+                session.auth_token = None
+                session.user_info = None
+                for key in LOGOUT_CLEARED_KEYS:
+                    session.pop(key, None)
                 st.rerun()
 
 
@@ -1,49 +1,326 @@
 """
 Database module for managing cases in JSON format
+
+``cases.json`` holds a snapshot of every case. Changes are appended to a
+newline-delimited journal next to it (``cases.json.log``) and replayed on top
+of the snapshot, so saving a case writes one line instead of the whole file.
+The journal is folded back into the snapshot by ``compact()`` once it grows.
+Appending and compacting hold an exclusive lock on the journal, so instances
+in other sessions or processes never lose each other's entries.
+
+``SQLiteCaseDatabase`` offers the same interface on top of SQLite for larger
+or multi-user deployments.
 """
-import json
+import csv
+import io
+from contextlib import closing, contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import logging
+import mmap
+import os
+import sqlite3
+from modules.utils import json_dumps, json_loads
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the journal is then appended to and
+    # compacted without a lock
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# Compact once the journal holds at least this many entries and outnumbers
+# the live cases by COMPACT_RATIO
+COMPACT_MIN_ENTRIES = 100
+COMPACT_RATIO = 1.0
+
+# Snapshots larger than this are parsed straight from a read-only memory map
+# rather than read into a buffer first; for small files the mapping costs more
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# Parsed snapshots shared by every CaseDatabase in the process, keyed by path
+# and validated against the file's (inode, mtime_ns, size). Streamlit builds a
+# new CaseDatabase on each rerun, so this saves re-parsing an unchanged file.
+# The cases in it are shared too, so only copies are handed to callers.
+_snapshot_cache: Dict[str, tuple] = {}
+
+# Fields matched by search_cases
+SEARCH_FIELDS = ('first_name', 'last_name', 'middle_name', 'case_number', 'charges', 'asa')
+
+# Status names accepted by get_cases_by_status and the flag each one indexes
+STATUS_FIELDS = {
+    'in custody': 'in_custody',
+    'on probation': 'on_probation',
+    'veteran': 'veteran',
+}
+
+def _search_text(case: Dict, separator: str = '\0') -> str:
+    """Lowercased searchable text for a case"""
+    # The separator never appears in a typed search term, so matches can't span fields
+    return separator.join(str(case.get(field, '')) for field in SEARCH_FIELDS).lower()
+
+def _copy_case(case: Dict) -> Dict:
+    """Copy of a case the caller can modify without changing the shared cached one"""
+    # Strings, numbers and booleans are immutable and are shared; only
+    # mutable containers are copied
+    return {
+        key: value.copy() if isinstance(value, (list, dict, set)) else value
+        for key, value in case.items()
+    }
+
+def _iter_csv(cases: List[Dict]) -> Iterator[str]:
+    """Yield cases as CSV text, one row at a time"""
+    if not cases:
+        return
+    
+    # Get all unique keys
+    fieldnames = sorted({key for case in cases for key in case})
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    for case in cases:
+        writer.writerow([case.get(key, '') for key in fieldnames])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def _write_csv(rows: Iterator[str], filepath: str):
+    """Write CSV rows to a file, skipping the file entirely when there are none"""
+    first = next(rows, None)
+    if first is None:
+        return
+    
+    with open(filepath, 'w', newline='') as f:
+        f.write(first)
+        f.writelines(rows)
+
 class CaseDatabase:
     """JSON-based database for case management"""
     
     def __init__(self, db_path: str = "data/cases.json"):
         self.db_path = Path(db_path)
+        self.log_path = self.db_path.with_name(self.db_path.name + '.log')
         self.db_path.parent.mkdir(exist_ok=True)
+        
+        # In-memory view of the snapshot plus replayed journal, keyed by case id,
+        # the ids of cases with each status flag set (dicts as ordered sets) and
+        # each case's lowercased searchable text
+        self._by_id: Dict[str, Dict] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._search_blobs: Dict[str, str] = {}
+        self._reset([])
+        self._snapshot_key = None
+        self._log_offset = 0
+        self._log_entries = 0
+        
         self._ensure_db_exists()
+        self._sync()
     
     def _ensure_db_exists(self):
         """Create database file if it doesn't exist"""
         if not self.db_path.exists():
             self._save_data([])
     
-    def _load_data(self) -> List[Dict]:
-        """Load data from JSON file"""
+    def _stat_key(self, path: Path):
+        """Identify the current version of a file on disk"""
         try:
-            with open(self.db_path, 'r') as f:
-                return json.load(f)
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _read_snapshot(self, snapshot_key=None) -> List[Dict]:
+        """Read the case list from the JSON snapshot"""
+        cache_key = str(self.db_path.resolve())
+        cached = _snapshot_cache.get(cache_key)
+        if snapshot_key is not None and cached and cached[0] == snapshot_key:
+            return cached[1]
+        
+        try:
+            with open(self.db_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        with memoryview(mm) as view:
+                            cases = json_loads(view)
+                else:
+                    cases = json_loads(f.read())
         except Exception as e:
             logger.error(f"Error loading database: {e}")
             return []
+        
+        if snapshot_key is not None:
+            _snapshot_cache[cache_key] = (snapshot_key, cases)
+        return cases
+    
+    def _reset(self, cases: List[Dict]):
+        """Rebuild the in-memory indexes from a full case list"""
+        self._by_id = {}
+        self._by_status = {field: {} for field in STATUS_FIELDS.values()}
+        self._search_blobs = {}
+        for case in cases:
+            self._index(case.get('id'), case)
+    
+    def _index(self, case_id: str, case: Dict):
+        """Add or replace a case in the in-memory indexes"""
+        self._by_id[case_id] = case
+        self._search_blobs[case_id] = _search_text(case)
+        for field, ids in self._by_status.items():
+            if case.get(field):
+                ids[case_id] = None
+            else:
+                ids.pop(case_id, None)
+    
+    def _apply(self, entry: Dict):
+        """Apply a single journal entry to the in-memory indexes"""
+        case_id = entry.get('id')
+        if entry.get('op') == 'delete':
+            self._by_id.pop(case_id, None)
+            self._search_blobs.pop(case_id, None)
+            for ids in self._by_status.values():
+                ids.pop(case_id, None)
+        else:
+            self._index(case_id, entry['case'])
+    
+    def _sync(self):
+        """Bring the in-memory index up to date with the files on disk
+        
+        A replaced snapshot (compaction, possibly by another instance) forces
+        a full reload; otherwise only journal lines appended since the last
+        sync are read.
+        """
+        snapshot_key = self._stat_key(self.db_path)
+        if snapshot_key != self._snapshot_key:
+            self._reset(self._read_snapshot(snapshot_key))
+            self._snapshot_key = snapshot_key
+            self._log_offset = 0
+            self._log_entries = 0
+        
+        log_key = self._stat_key(self.log_path)
+        log_size = log_key[2] if log_key else 0
+        if log_size < self._log_offset:
+            # Journal was truncated underneath us
+            self._snapshot_key = None
+            return self._sync()
+        if log_size == self._log_offset:
+            return
+        
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read(log_size - self._log_offset)
+        
+        # Only consume complete lines; a concurrent writer may be mid-line
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json_loads(line))
+                self._log_entries += 1
+            except Exception as e:
+                logger.error(f"Skipping unreadable journal entry: {e}")
+        self._log_offset += end
+    
+    @contextmanager
+    def _journal_lock(self):
+        """Open the journal for appending, holding an exclusive lock on it
+        
+        Every instance takes the lock to append or compact, so an entry can't
+        be appended between a compaction reading the journal and clearing it.
+        """
+        with open(self.log_path, 'a+b') as journal:
+            if fcntl is not None:
+                fcntl.flock(journal, fcntl.LOCK_EX)
+            yield journal
+    
+    def _append(self, entry: Dict):
+        """Append an entry to the journal and replay it"""
+        line = json_dumps(entry) + b'\n'
+        with self._journal_lock() as journal:
+            journal.write(line)
+        self._sync()
+        
+        if (self._log_entries >= COMPACT_MIN_ENTRIES
+                and self._log_entries > len(self._by_id) * COMPACT_RATIO):
+            self.compact()
+    
+    def _refresh(self):
+        """Sync with disk, keeping the current view if that fails"""
+        try:
+            self._sync()
+        except Exception as e:
+            logger.error(f"Error loading database: {e}")
+    
+    def _load_data(self) -> List[Dict]:
+        """Load data from JSON file"""
+        self._refresh()
+        return list(self._by_id.values())
     
     def _save_data(self, data: List[Dict]):
-        """Save data to JSON file"""
+        """Save data to JSON file, replacing the snapshot and clearing the journal"""
         try:
-            with open(self.db_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            with self._journal_lock() as journal:
+                self._write_snapshot(data, journal)
+        except Exception as e:
+            logger.error(f"Error saving database: {e}")
+            return
+        self._sync()
+    
+    def _write_snapshot(self, data: List[Dict], journal):
+        """Replace the snapshot with data and clear the journal; needs the journal lock"""
+        # Entries other instances appended since our last sync are not in
+        # data, so they are kept and replayed on top of the new snapshot
+        if self._snapshot_key is not None and self._stat_key(self.db_path) == self._snapshot_key:
+            journal.seek(self._log_offset)
+        else:
+            journal.seek(0)
+        unseen = journal.read()
+        
+        tmp_path = self.db_path.with_name(self.db_path.name + '.tmp')
+        try:
+            # Write a temporary file and swap it in, so readers never see a
+            # half-written snapshot
+            with open(tmp_path, 'wb') as f:
+                f.write(json_dumps(data, indent=True))
+            os.replace(tmp_path, self.db_path)
+        except Exception:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            raise
+        
+        # Journal entries are idempotent, so clearing the journal after the
+        # snapshot is written is safe even if we stop in between
+        journal.truncate(0)
+        journal.write(unseen)
+        journal.flush()
+        
+        self._reset(data)
+        self._snapshot_key = self._stat_key(self.db_path)
+        _snapshot_cache[str(self.db_path.resolve())] = (self._snapshot_key, data)
+        self._log_offset = 0
+        self._log_entries = 0
+    
+    def version(self) -> tuple:
+        """Token that changes whenever the database files change on disk"""
+        return (self._stat_key(self.db_path), self._stat_key(self.log_path))
+    
+    def compact(self):
+        """Fold the journal into the JSON snapshot"""
+        try:
+            with self._journal_lock() as journal:
+                self._sync()
+                self._write_snapshot(list(self._by_id.values()), journal)
         except Exception as e:
             logger.error(f"Error saving database: {e}")
     
     def add_case(self, case_data: Dict) -> bool:
         """Add a new case"""
         try:
-            cases = self._load_data()
-            cases.append(case_data)
-            self._save_data(cases)
+            self._append({'op': 'put', 'id': case_data.get('id'), 'case': case_data})
             return True
         except Exception as e:
             logger.error(f"Error adding case: {e}")
@@ -52,13 +329,11 @@ class CaseDatabase:
     def update_case(self, case_id: str, case_data: Dict) -> bool:
         """Update an existing case"""
         try:
-            cases = self._load_data()
-            for i, case in enumerate(cases):
-                if case.get('id') == case_id:
-                    cases[i] = case_data
-                    self._save_data(cases)
-                    return True
-            return False
+            self._sync()
+            if case_id not in self._by_id:
+                return False
+            self._append({'op': 'put', 'id': case_id, 'case': case_data})
+            return True
         except Exception as e:
             logger.error(f"Error updating case: {e}")
             return False
@@ -66,9 +341,10 @@ class CaseDatabase:
     def delete_case(self, case_id: str) -> bool:
         """Delete a case"""
         try:
-            cases = self._load_data()
-            cases = [c for c in cases if c.get('id') != case_id]
-            self._save_data(cases)
+            self._sync()
+            if case_id not in self._by_id:
+                return False
+            self._append({'op': 'delete', 'id': case_id})
             return True
         except Exception as e:
             logger.error(f"Error deleting case: {e}")
@@ -76,38 +352,24 @@ class CaseDatabase:
     
     def get_case(self, case_id: str) -> Optional[Dict]:
         """Get a specific case"""
-        cases = self._load_data()
-        for case in cases:
-            if case.get('id') == case_id:
-                return case
-        return None
+        self._refresh()
+        case = self._by_id.get(case_id)
+        return _copy_case(case) if case is not None else None
     
     def get_all_cases(self) -> List[Dict]:
         """Get all cases"""
-        return self._load_data()
+        return [_copy_case(case) for case in self._load_data()]
     
     def search_cases(self, search_term: str) -> List[Dict]:
         """Search cases by name or case number"""
         search_term = search_term.lower()
-        cases = self._load_data()
+        self._refresh()
         
-        results = []
-        for case in cases:
-            # Search in multiple fields
-            searchable_fields = [
-                case.get('first_name', ''),
-                case.get('last_name', ''),
-                case.get('middle_name', ''),
-                case.get('case_number', ''),
-                case.get('charges', ''),
-                case.get('asa', '')
-            ]
-            
-            # Check if search term appears in any field
-            if any(search_term in str(field).lower() for field in searchable_fields):
-                results.append(case)
-        
-        return results
+        return [
+            _copy_case(self._by_id[case_id])
+            for case_id, blob in self._search_blobs.items()
+            if search_term in blob
+        ]
     
     def get_cases_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
         """Get cases within a date range"""
@@ -117,41 +379,261 @@ class CaseDatabase:
         for case in cases:
             court_date = case.get('court_date')
             if court_date and start_date <= court_date <= end_date:
-                results.append(case)
+                results.append(_copy_case(case))
         
         return sorted(results, key=lambda x: x.get('court_date', ''))
     
     def get_cases_by_status(self, status: str) -> List[Dict]:
         """Get cases by status (e.g., 'In Custody', 'On Probation')"""
-        cases = self._load_data()
-        results = []
-        
-        status_lower = status.lower()
-        for case in cases:
-            if status_lower == 'in custody' and case.get('in_custody'):
-                results.append(case)
-            elif status_lower == 'on probation' and case.get('on_probation'):
-                results.append(case)
-            elif status_lower == 'veteran' and case.get('veteran'):
-                results.append(case)
+        field = STATUS_FIELDS.get(status.lower())
+        if field is None:
+            return []
         
-        return results
+        self._refresh()
+        return [_copy_case(self._by_id[case_id]) for case_id in self._by_status[field]]
+    
+    def iter_csv(self) -> Iterator[str]:
+        """Yield all cases as CSV text, one row at a time"""
+        return _iter_csv(self._load_data())
     
     def export_to_csv(self, filepath: str):
         """Export all cases to CSV"""
-        import csv
+        _write_csv(self.iter_csv(), filepath)
         
-        cases = self._load_data()
-        if not cases:
-            return
+
+class SQLiteCaseDatabase:
+    """SQLite-based database for case management
+    
+    Each case is one row. The full case is kept as JSON in ``data``, and the
+    fields used for lookups are copied into indexed columns.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cases (
+            id TEXT PRIMARY KEY,
+            last_name TEXT,
+            first_name TEXT,
+            case_number TEXT,
+            court_date TEXT,
+            in_custody INTEGER NOT NULL DEFAULT 0,
+            on_probation INTEGER NOT NULL DEFAULT 0,
+            veteran INTEGER NOT NULL DEFAULT 0,
+            search_text TEXT NOT NULL DEFAULT '',
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cases_name ON cases(last_name, first_name);
+        CREATE INDEX IF NOT EXISTS idx_cases_court_date ON cases(court_date);
+        CREATE INDEX IF NOT EXISTS idx_cases_in_custody ON cases(id) WHERE in_custody;
+        CREATE INDEX IF NOT EXISTS idx_cases_on_probation ON cases(id) WHERE on_probation;
+        CREATE INDEX IF NOT EXISTS idx_cases_veteran ON cases(id) WHERE veteran;
+    """
+    
+    # Trigram index over search_text, so substring searches match what
+    # CaseDatabase.search_cases finds without scanning every row
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE cases_fts USING fts5(
+            search_text, content='cases', content_rowid='rowid', tokenize='trigram'
+        );
+        CREATE TRIGGER cases_fts_insert AFTER INSERT ON cases BEGIN
+            INSERT INTO cases_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+        END;
+        CREATE TRIGGER cases_fts_delete AFTER DELETE ON cases BEGIN
+            INSERT INTO cases_fts(cases_fts, rowid, search_text)
+            VALUES ('delete', old.rowid, old.search_text);
+        END;
+        CREATE TRIGGER cases_fts_update AFTER UPDATE ON cases BEGIN
+            INSERT INTO cases_fts(cases_fts, rowid, search_text)
+            VALUES ('delete', old.rowid, old.search_text);
+            INSERT INTO cases_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+        END;
+    """
+    
+    # Trigrams need at least three characters to match anything
+    FTS_MIN_TERM = 3
+    
+    # FTS5 stops reading text at NUL, so fields are newline separated here
+    SEARCH_SEPARATOR = '\n'
+    
+    def __init__(self, db_path: str = "data/cases.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(exist_ok=True)
         
-        # Get all unique keys
-        all_keys = set()
-        for case in cases:
-            all_keys.update(case.keys())
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            self._fts = self._ensure_fts(conn)
+    
+    def _ensure_fts(self, conn: sqlite3.Connection) -> bool:
+        """Create the search index if needed; False when FTS5 is unavailable"""
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'cases_fts'"
+        ).fetchone():
+            return True
         
-        # Write CSV
-        with open(filepath, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=sorted(all_keys))
-            writer.writeheader()
-            writer.writerows(cases)
\ No newline at end of file
+        # Re-key cases stored before the search index existed; done before the
+        # triggers exist, which expect every old row to be in the index
+        rows = conn.execute("SELECT id, data FROM cases").fetchall()
+        with conn:
+            conn.executemany(
+                "UPDATE cases SET search_text = ? WHERE id = ?",
+                [(_search_text(json_loads(data), self.SEARCH_SEPARATOR), case_id)
+                 for case_id, data in rows]
+            )
+        
+        try:
+            conn.executescript(self.FTS_SCHEMA)
+            with conn:
+                conn.execute("INSERT INTO cases_fts(cases_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search unavailable, using substring scan: {e}")
+            return False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; Streamlit reruns may run on different threads"""
+        return sqlite3.connect(self.db_path, timeout=10)
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        """Run a SELECT over the data column and decode the cases"""
+        try:
+            with closing(self._connect()) as conn:
+                return [json_loads(row[0]) for row in conn.execute(sql, params)]
+        except Exception as e:
+            logger.error(f"Error loading database: {e}")
+            return []
+    
+    def _row(self, case_id: str, case_data: Dict) -> tuple:
+        """Column values for a case"""
+        return (
+            case_id,
+            case_data.get('last_name'),
+            case_data.get('first_name'),
+            case_data.get('case_number'),
+            case_data.get('court_date') or None,
+            int(bool(case_data.get('in_custody'))),
+            int(bool(case_data.get('on_probation'))),
+            int(bool(case_data.get('veteran'))),
+            _search_text(case_data, self.SEARCH_SEPARATOR),
+            json_dumps(case_data).decode(),
+        )
+    
+    def _upsert(self, conn: sqlite3.Connection, case_id: str, case_data: Dict):
+        """Insert or replace a case, keeping its original position"""
+        conn.execute(
+            """
+            INSERT INTO cases (id, last_name, first_name, case_number, court_date,
+                               in_custody, on_probation, veteran, search_text, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                last_name = excluded.last_name,
+                first_name = excluded.first_name,
+                case_number = excluded.case_number,
+                court_date = excluded.court_date,
+                in_custody = excluded.in_custody,
+                on_probation = excluded.on_probation,
+                veteran = excluded.veteran,
+                search_text = excluded.search_text,
+                data = excluded.data
+            """,
+            self._row(case_id, case_data)
+        )
+    
+    def import_from_json(self, json_path: str = "data/cases.json") -> int:
+        """Copy every case from a JSON CaseDatabase; returns the number imported"""
+        cases = CaseDatabase(json_path).get_all_cases()
+        with closing(self._connect()) as conn, conn:
+            for case in cases:
+                self._upsert(conn, case.get('id'), case)
+        return len(cases)
+    
+    def version(self) -> tuple:
+        """Token that changes whenever the database files change on disk"""
+        keys = []
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + '-wal')):
+            try:
+                st = path.stat()
+                keys.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                keys.append(None)
+        return tuple(keys)
+    
+    def add_case(self, case_data: Dict) -> bool:
+        """Add a new case"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                self._upsert(conn, case_data.get('id'), case_data)
+            return True
+        except Exception as e:
+            logger.error(f"Error adding case: {e}")
+            return False
+    
+    def update_case(self, case_id: str, case_data: Dict) -> bool:
+        """Update an existing case"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                if not conn.execute("SELECT 1 FROM cases WHERE id = ?", (case_id,)).fetchone():
+                    return False
+                self._upsert(conn, case_id, case_data)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating case: {e}")
+            return False
+    
+    def delete_case(self, case_id: str) -> bool:
+        """Delete a case"""
+        try:
+            with closing(self._connect()) as conn, conn:
+                return conn.execute("DELETE FROM cases WHERE id = ?", (case_id,)).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error deleting case: {e}")
+            return False
+    
+    def get_case(self, case_id: str) -> Optional[Dict]:
+        """Get a specific case"""
+        cases = self._query("SELECT data FROM cases WHERE id = ?", (case_id,))
+        return cases[0] if cases else None
+    
+    def get_all_cases(self) -> List[Dict]:
+        """Get all cases"""
+        return self._query("SELECT data FROM cases ORDER BY rowid")
+    
+    def search_cases(self, search_term: str) -> List[Dict]:
+        """Search cases by name or case number"""
+        search_term = search_term.lower()
+        if self._fts and len(search_term) >= self.FTS_MIN_TERM:
+            # Quoted as a phrase so punctuation like '-' is matched literally
+            return self._query(
+                """
+                SELECT cases.data FROM cases_fts
+                JOIN cases ON cases.rowid = cases_fts.rowid
+                WHERE cases_fts MATCH ? ORDER BY cases.rowid
+                """,
+                ('"' + search_term.replace('"', '""') + '"',)
+            )
+        return self._query(
+            "SELECT data FROM cases WHERE instr(search_text, ?) > 0 ORDER BY rowid",
+            (search_term,)
+        )
+    
+    def get_cases_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
+        """Get cases within a date range"""
+        return self._query(
+            "SELECT data FROM cases WHERE court_date BETWEEN ? AND ? ORDER BY court_date",
+            (start_date, end_date)
+        )
+    
+    def get_cases_by_status(self, status: str) -> List[Dict]:
+        """Get cases by status (e.g., 'In Custody', 'On Probation')"""
+        field = STATUS_FIELDS.get(status.lower())
+        if field is None:
+            return []
+        # field comes from STATUS_FIELDS, never from user input
+        return self._query(f"SELECT data FROM cases WHERE {field} ORDER BY rowid")
+    
+    def iter_csv(self) -> Iterator[str]:
+        """Yield all cases as CSV text, one row at a time"""
+        return _iter_csv(self.get_all_cases())
+    
+    def export_to_csv(self, filepath: str):
+        """Export all cases to CSV"""
+        _write_csv(self.iter_csv(), filepath)
\ No newline at end of file
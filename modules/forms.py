@@ -4,6 +4,15 @@ Forms module for rendering input components
 import streamlit as st
 from datetime import date, datetime, time
 from typing import Dict
+from modules.utils import parse_iso_date
+
+CASE_TYPES = ("Felony", "Misdemeanor", "Felony and/or MM", "Other")
+_CASE_TYPE_INDEX = {case_type: i for i, case_type in enumerate(CASE_TYPES)}
+DEFAULT_CASE_TYPE = "Felony and/or MM"
+
+def _date_value(value):
+    """Date widget value for a stored date, parsing ISO strings"""
+    return parse_iso_date(value) if isinstance(value, str) else value
 
 def render_defendant_info(case_data: Dict):
     """Render defendant information form"""
@@ -33,13 +42,7 @@ def render_defendant_info(case_data: Dict):
         )
     
     # DOB
-    dob_value = case_data.get('dob')
-    if dob_value:
-        try:
-            if isinstance(dob_value, str):
-                dob_value = datetime.fromisoformat(dob_value).date()
-        except:
-            dob_value = None
+    dob_value = _date_value(case_data.get('dob'))
     
     case_data['dob'] = st.date_input(
         "Date of Birth",
@@ -188,12 +191,7 @@ def render_case_info(case_data: Dict):
         )
     
     with col2:
-        applied_date = case_data.get('applied_date')
-        if applied_date and isinstance(applied_date, str):
-            try:
-                applied_date = datetime.fromisoformat(applied_date).date()
-            except:
-                applied_date = None
+        applied_date = _date_value(case_data.get('applied_date'))
         
         case_data['applied_date'] = st.date_input(
             "Applied Date",
@@ -202,12 +200,7 @@ def render_case_info(case_data: Dict):
             format="MM/DD/YYYY"
         )
         
-        appointed_date = case_data.get('appointed_date')
-        if appointed_date and isinstance(appointed_date, str):
-            try:
-                appointed_date = datetime.fromisoformat(appointed_date).date()
-            except:
-                appointed_date = None
+        appointed_date = _date_value(case_data.get('appointed_date'))
         
         case_data['appointed_date'] = st.date_input(
             "Appointed Date",
@@ -219,9 +212,10 @@ def render_case_info(case_data: Dict):
     # Case type
     case_data['case_type'] = st.selectbox(
         "Case Type",
-        options=["Felony", "Misdemeanor", "Felony and/or MM", "Other"],
-        index=["Felony", "Misdemeanor", "Felony and/or MM", "Other"].index(
-            case_data.get('case_type', 'Felony and/or MM')
+        options=CASE_TYPES,
+        # Unknown stored values fall back to the default instead of raising
+        index=_CASE_TYPE_INDEX.get(
+            case_data.get('case_type'), _CASE_TYPE_INDEX[DEFAULT_CASE_TYPE]
         ),
         key="case_type"
     )
@@ -292,12 +286,7 @@ def render_court_info(case_data: Dict):
     col1, col2 = st.columns(2)
     
     with col1:
-        court_date = case_data.get('court_date')
-        if court_date and isinstance(court_date, str):
-            try:
-                court_date = datetime.fromisoformat(court_date).date()
-            except:
-                court_date = None
+        court_date = _date_value(case_data.get('court_date'))
         
         case_data['court_date'] = st.date_input(
             "Next Court Date",
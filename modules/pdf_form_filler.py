@@ -1,13 +1,203 @@
 """
 PDF Form Filler module for filling the official Case Opening Sheet PDF
 """
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader, PdfWriter, PageObject
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import io
+import os
+import threading
+from modules.utils import format_date, format_time
+
+# Where each field goes on the official form, in points from the bottom left
+
+# Text fields: (key, x, y, max length or None, formatter for date/time values)
+FIELD_LAYOUT = (
+    # Header row - Date, Page, Applied, Appointed
+    ('court_date', 90, 750, None, format_date),
+    ('page_number', 340, 750, None, None),
+    ('applied_date', 420, 750, 10, format_date),
+    ('appointed_date', 530, 750, 10, format_date),
+    # Second line - ASA/Score/Offer
+    ('asa', 90, 730, 18, None),
+    ('score', 270, 730, 15, None),
+    ('offer', 420, 730, 25, None),
+    # Name section
+    ('last_name', 100, 650, 15, None),
+    ('first_name', 240, 650, 12, None),
+    ('middle_name', 380, 650, 10, None),
+    ('dob', 480, 650, None, format_date),
+    # Address, then City, State, Zip line
+    ('address', 120, 620, 45, None),
+    ('city', 60, 590, 18, None),
+    ('state', 240, 590, 2, None),
+    ('zip_code', 350, 590, 10, None),
+    # Phone section
+    ('phone_home', 80, 560, 12, None),
+    ('phone_cell', 220, 560, 12, None),
+    ('phone_other', 380, 560, 12, None),
+    # Court information box (Next Court Action & Intake Info)
+    ('court_date', 140, 495, None, format_date),
+    ('court_time', 110, 475, None, format_time),
+    ('division', 140, 455, 12, None),
+    ('other_court_action', 420, 435, 18, None),
+    ('immigration_status', 220, 375, 12, None),
+    # Case number, disposition, attorney and reset reason
+    ('case_number', 120, 220, 25, None),
+    ('disposition_sentence', 400, 120, 35, None),
+    ('attorney', 120, 90, 18, None),
+    ('reset_reason', 390, 90, 30, None),
+)
+
+# Marks drawn only when a field is set: (key, x, y, mark)
+CHECKBOX_LAYOUT = (
+    # Court actions in the court box
+    ('case_dispo', 495, 495, "X"),
+    ('status_check', 575, 495, "X"),
+    ('cal_call', 420, 475, "X"),
+    ('non_jury_trial', 500, 475, "X"),
+    ('jury_trial', 420, 455, "X"),
+    ('sentencing', 500, 455, "X"),
+    # Mental Health Issues is a text field on the form
+    ('mental_health_issues', 160, 315, "Issues noted"),
+)
+
+# Yes/No checkbox pairs, one of which is always marked: (key, x_yes, x_no, y)
+YES_NO_LAYOUT = (
+    ('on_probation', 385, 360, 415),
+    ('pending_charges', 570, 545, 415),
+    ('in_custody', 385, 360, 395),
+    ('veteran', 220, 195, 355),
+    ('physical_disabilities', 320, 295, 295),
+)
+
+# Multi-line text, 12 points apart: (key, x, y of first line, max length, max lines)
+MULTILINE_LAYOUT = (
+    ('defendant_comments', 120, 270, 65, 2),
+    # Only two lines of charges fit above the next section
+    ('charges', 420, 220, 25, 2),
+)
+
+# Parsed templates keyed by absolute path, as ((mtime_ns, size), PdfReader).
+# Output pages are cloned from the template, so it is never modified
+_template_cache: Dict[str, tuple] = {}
+_template_lock = threading.Lock()
+
+
+# Resource name of the case data overlay on the output page
+_OVERLAY_NAME = NameObject('/CaseOpeningOverlay')
+
+# Overlay text is 9 point Helvetica, one of the standard PDF fonts, so
+# nothing has to be embedded
+FONT_SIZE = 9
+_FONT = {
+    NameObject('/Type'): NameObject('/Font'),
+    NameObject('/Subtype'): NameObject('/Type1'),
+    NameObject('/BaseFont'): NameObject('/Helvetica'),
+    NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+}
+
+# Characters with a special meaning inside a PDF literal string
+_PDF_STRING_ESCAPES = str.maketrans({'\\': '\\\\', '(': '\\(', ')': '\\)'})
+
+
+def _overlay_text(case_data: Dict) -> List[Tuple[int, int, str]]:
+    """The (x, y, text) strings to draw on the form for a case"""
+    drawn = []
+    
+    for key, x, y, max_length, formatter in FIELD_LAYOUT:
+        value = case_data.get(key)
+        if value:
+            value = formatter(value) if formatter else str(value)
+            drawn.append((x, y, value[:max_length]))
+    
+    for key, x, y, mark in CHECKBOX_LAYOUT:
+        if case_data.get(key):
+            drawn.append((x, y, mark))
+    
+    for key, x_yes, x_no, y in YES_NO_LAYOUT:
+        drawn.append((x_yes if case_data.get(key) else x_no, y, "X"))
+    
+    for key, x, y, max_length, max_lines in MULTILINE_LAYOUT:
+        if case_data.get(key):
+            for i, line in enumerate(case_data[key].split('\n')[:max_lines]):
+                drawn.append((x, y - 12 * i, line[:max_length]))
+    
+    return drawn
+
+
+def _render_overlay(drawn: List[Tuple[int, int, str]]) -> bytes:
+    """Content stream drawing each string at its position"""
+    # Written directly rather than through a ReportLab canvas, which builds
+    # and then has to re-parse a whole PDF document for a few text operators
+    font = b"/F1 %d Tf" % FONT_SIZE
+    ops = []
+    for x, y, text in drawn:
+        # WinAnsiEncoding is cp1252; anything outside it is drawn as '?'
+        text = text.translate(_PDF_STRING_ESCAPES).encode('cp1252', errors='replace')
+        ops.append(b"BT %s %d %d Td (%s) Tj ET" % (font, x, y, text))
+    return b"\n".join(ops)
+
+
+def _stream(data: bytes, writer: PdfWriter):
+    """Add a content stream to the writer and return its reference"""
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return writer._add_object(stream)
+
+
+def _add_overlay(writer: PdfWriter, page: PageObject, content: bytes):
+    """Draw an overlay content stream on top of page without re-parsing the page"""
+    # PageObject.merge_page parses and re-serializes the template's whole
+    # content stream; instead the overlay becomes a form XObject drawn after it
+    font = DictionaryObject(_FONT)
+    overlay = DecodedStreamObject()
+    overlay.set_data(content)
+    overlay.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        NameObject('/BBox'): ArrayObject(page.mediabox),
+        NameObject('/Resources'): DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): writer._add_object(font)}),
+        }),
+    })
+    
+    resources = page['/Resources'].get_object()
+    if '/XObject' not in resources:
+        resources[NameObject('/XObject')] = DictionaryObject()
+    resources['/XObject'].get_object()[_OVERLAY_NAME] = writer._add_object(overlay)
+    
+    contents = page.raw_get('/Contents') if '/Contents' in page else ArrayObject()
+    if isinstance(contents.get_object(), ArrayObject):
+        contents = list(contents.get_object())
+    else:
+        contents = [contents]
+    
+    # The template is wrapped in q/Q so none of its graphics state carries
+    # over to the overlay
+    page[NameObject('/Contents')] = ArrayObject(
+        [_stream(b"q\n", writer)] + contents
+        + [_stream(b"\nQ\nq " + _OVERLAY_NAME.encode() + b" Do Q\n", writer)]
+    )
+
+
+def _get_template(template_path: str) -> PdfReader:
+    """Parsed template PDF, re-read only when the file changes"""
+    st_ = os.stat(template_path)
+    stat_key = (st_.st_mtime_ns, st_.st_size)
+    cache_key = os.path.abspath(template_path)
+    cached = _template_cache.get(cache_key)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+    
+    with open(template_path, 'rb') as f:
+        template_pdf = PdfReader(io.BytesIO(f.read()))
+    _template_cache[cache_key] = (stat_key, template_pdf)
+    return template_pdf
 
 
 def fill_official_form(case_data: Dict, template_path: str = "CASE OPENING SHEET.pdf") -> str:
@@ -23,243 +213,34 @@ def fill_official_form(case_data: Dict, template_path: str = "CASE OPENING SHEET
     Path("exports/pdfs").mkdir(parents=True, exist_ok=True)
     
     # Read the template PDF
-    template_pdf = PdfReader(template_path)
+    template_pdf = _get_template(template_path)
     output_pdf = PdfWriter()
     
-    # Create a new PDF with the form data
-    packet = io.BytesIO()
-    can = canvas.Canvas(packet, pagesize=letter)
-    
-    # Set font
-    can.setFont("Helvetica", 9)
-    
-    # Header row - Top of page
-    # Date (after "Date:")
-    if case_data.get('court_date'):
-        court_date = case_data['court_date']
-        if hasattr(court_date, 'strftime'):
-            court_date = court_date.strftime('%m/%d/%Y')
-        can.drawString(90, 750, court_date)
-    
-    # Page number (after "Page:")
-    if case_data.get('page_number'):
-        can.drawString(340, 750, case_data['page_number'])
-    
-    # Applied date (after "Applied:")
-    if case_data.get('applied_date'):
-        applied_date = case_data['applied_date']
-        if hasattr(applied_date, 'strftime'):
-            applied_date = applied_date.strftime('%m/%d/%Y')
-        can.drawString(420, 750, applied_date[:10])
-    
-    # Appointed date (after "Appointed:")
-    if case_data.get('appointed_date'):
-        appointed_date = case_data['appointed_date']
-        if hasattr(appointed_date, 'strftime'):
-            appointed_date = appointed_date.strftime('%m/%d/%Y')
-        can.drawString(530, 750, appointed_date[:10])
-    
-    # Second line - ASA/Score/Offer
-    # ASA (after "ASA:")
-    if case_data.get('asa'):
-        can.drawString(90, 730, case_data['asa'][:18])
-    
-    # Score (after "Score:")
-    if case_data.get('score'):
-        can.drawString(270, 730, case_data['score'][:15])
-    
-    # Offer (after "Offer:")
-    if case_data.get('offer'):
-        can.drawString(420, 730, case_data['offer'][:25])
-    
-    # Name section - under "Name" header
-    # Last Name
-    if case_data.get('last_name'):
-        can.drawString(100, 650, case_data['last_name'][:15])
-    
-    # First Name
-    if case_data.get('first_name'):
-        can.drawString(240, 650, case_data['first_name'][:12])
-    
-    # Middle Name
-    if case_data.get('middle_name'):
-        can.drawString(380, 650, case_data['middle_name'][:10])
-    
-    # DOB (Date of Birth)
-    if case_data.get('dob'):
-        dob = case_data['dob']
-        if hasattr(dob, 'strftime'):
-            dob = dob.strftime('%m/%d/%Y')
-        can.drawString(480, 650, dob)
-    
-    # Address (after "Address:")
-    if case_data.get('address'):
-        can.drawString(120, 620, case_data['address'][:45])
+    # Add the overlay to a copy of the template page; the shared reader is
+    # read under a lock since its parser is not thread-safe
+    with _template_lock:
+        page = output_pdf.add_page(template_pdf.pages[0])
+    _add_overlay(output_pdf, page, _render_overlay(_overlay_text(case_data)))
     
-    # City, State, Zip line
-    if case_data.get('city'):
-        can.drawString(60, 590, case_data['city'][:18])
+    # Serialize in memory and write the file in one call; PyPDF2 otherwise
+    # issues many small writes straight to the file
+    buffer = io.BytesIO()
+    output_pdf.write(buffer)
+    Path(output_filename).write_bytes(buffer.getbuffer())
     
-    if case_data.get('state'):
-        can.drawString(240, 590, case_data['state'][:2])
-    
-    if case_data.get('zip_code'):
-        can.drawString(350, 590, case_data['zip_code'][:10])
-    
-    # Phone section
-    # Home Phone
-    if case_data.get('phone_home'):
-        can.drawString(80, 560, case_data['phone_home'][:12])
-    
-    # Cell Phone  
-    if case_data.get('phone_cell'):
-        can.drawString(220, 560, case_data['phone_cell'][:12])
-    
-    # Other Phone
-    if case_data.get('phone_other'):
-        can.drawString(380, 560, case_data['phone_other'][:12])
-    
-    # Court information box (Next Court Action & Intake Info)
-    # Court Date (after "Court Date:")
-    if case_data.get('court_date'):
-        court_date = case_data['court_date']
-        if hasattr(court_date, 'strftime'):
-            court_date = court_date.strftime('%m/%d/%Y')
-        can.drawString(140, 495, court_date)
-    
-    # Time (after "Time:")
-    if case_data.get('court_time'):
-        court_time = case_data['court_time']
-        if hasattr(court_time, 'strftime'):
-            court_time = court_time.strftime('%I:%M %p')
-        can.drawString(110, 475, court_time)
-    
-    # Division (after "Division:")
-    if case_data.get('division'):
-        can.drawString(140, 455, case_data['division'][:12])
-    
-    # Right side checkboxes in the court box
-    # Case Dispo checkbox
-    if case_data.get('case_dispo'):
-        can.drawString(495, 495, "X")
-    
-    # Status Check checkbox  
-    if case_data.get('status_check'):
-        can.drawString(575, 495, "X")
-    
-    # Cal Call checkbox
-    if case_data.get('cal_call'):
-        can.drawString(420, 475, "X")
-    
-    # Non Jury Trial checkbox
-    if case_data.get('non_jury_trial'):
-        can.drawString(500, 475, "X")
-    
-    # Jury Trial checkbox
-    if case_data.get('jury_trial'):
-        can.drawString(420, 455, "X")
-    
-    # Sentencing checkbox
-    if case_data.get('sentencing'):
-        can.drawString(500, 455, "X")
-    
-    # Other court action (after "Other:")
-    if case_data.get('other_court_action'):
-        can.drawString(420, 435, case_data['other_court_action'][:18])
-    
-    # Status checkboxes (bottom section)
-    # Defendant on Probation/Parole
-    if case_data.get('on_probation'):
-        can.drawString(385, 415, "X")  # Yes checkbox
-    else:
-        can.drawString(360, 415, "X")  # No checkbox
-    
-    # Pending Charges  
-    if case_data.get('pending_charges'):
-        can.drawString(570, 415, "X")  # Yes checkbox
-    else:
-        can.drawString(545, 415, "X")  # No checkbox
-    
-    # Defendant in Custody
-    if case_data.get('in_custody'):
-        can.drawString(385, 395, "X")  # Yes checkbox
-    else:
-        can.drawString(360, 395, "X")  # No checkbox
-    
-    # Immigration Status (after "Immigration Status:")
-    if case_data.get('immigration_status'):
-        can.drawString(220, 375, case_data['immigration_status'][:12])
-    
-    # Veteran
-    if case_data.get('veteran'):
-        can.drawString(220, 355, "X")  # Yes checkbox
-    else:
-        can.drawString(195, 355, "X")  # No checkbox
-    
-    # Case type - Felony and/or MM (this appears to be pre-printed)
-    
-    # Mental Health Issues (text field)
-    if case_data.get('mental_health_issues'):
-        can.drawString(160, 315, "Issues noted")
-    
-    # Physical disabilities  
-    if case_data.get('physical_disabilities'):
-        can.drawString(320, 295, "X")  # Yes checkbox
-    else:
-        can.drawString(295, 295, "X")  # No checkbox
-    
-    # Comments section (after "Comments:")
-    if case_data.get('defendant_comments'):
-        comments = case_data['defendant_comments']
-        # Split into lines to fit in the space
-        lines = comments.split('\n')
-        y_pos = 270
-        for i, line in enumerate(lines[:2]):  # Max 2 lines to fit
-            if y_pos > 250:
-                can.drawString(120, y_pos, line[:65])
-                y_pos -= 12
-    
-    # Case number (after "Case No.:")
-    if case_data.get('case_number'):
-        can.drawString(120, 220, case_data['case_number'][:25])
-    
-    # Charges (after "Charge")
-    if case_data.get('charges'):
-        charges = case_data['charges']
-        lines = charges.split('\n')
-        y_pos = 220
-        for i, line in enumerate(lines[:3]):  # Max 3 lines
-            if y_pos > 200:
-                can.drawString(420, y_pos, line[:25])
-                y_pos -= 12
-    
-    # Disposition/Sentence (after "DISPOSITION/SENTENCE")
-    if case_data.get('disposition_sentence'):
-        disposition = case_data['disposition_sentence']
-        can.drawString(400, 120, disposition[:35])
-    
-    # Attorney (after "ATTORNEY:")
-    if case_data.get('attorney'):
-        can.drawString(120, 90, case_data['attorney'][:18])
-    
-    # Reset reason (after "Reset Because:")
-    if case_data.get('reset_reason'):
-        can.drawString(390, 90, case_data['reset_reason'][:30])
-    
-    # Save the overlay
-    can.save()
-    
-    # Move to the beginning of the BytesIO buffer
-    packet.seek(0)
-    new_pdf = PdfReader(packet)
-    
-    # Add the overlay to the template
-    page = template_pdf.pages[0]
-    page.merge_page(new_pdf.pages[0])
-    output_pdf.add_page(page)
-    
-    # Write the output PDF
-    with open(output_filename, "wb") as output_file:
-        output_pdf.write(output_file)
-    
-    return output_filename
\ No newline at end of file
+    return output_filename
+
+
+def fill_forms_bulk(cases: List[Dict], template_path: str = "CASE OPENING SHEET.pdf",
+                    workers: Optional[int] = None) -> List[str]:
+    """Fill the official form for many cases across worker processes"""
+    fill = partial(fill_official_form, template_path=template_path)
+    workers = min(workers or os.cpu_count() or 1, len(cases))
+    
+    # Starting processes costs more than filling a single form
+    if workers <= 1:
+        return [fill(case_data) for case_data in cases]
+    
+    # Each worker parses the template once into its own cache
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(fill, cases))
\ No newline at end of file
@@ -6,46 +6,84 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, date, time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
+import hashlib
+import io
+import os
+from modules.utils import json_dumps, format_date, format_time
 
-def generate_case_pdf(case_data: Dict) -> str:
-    """Generate PDF from case data"""
-    # Create filename
-    defendant_name = f"{case_data.get('last_name', 'Unknown')}_{case_data.get('first_name', '')}"
-    case_number = case_data.get('case_number', 'no_case_number').replace('/', '_')
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    filename = f"exports/pdfs/{defendant_name}_{case_number}_{timestamp}.pdf"
-    Path("exports/pdfs").mkdir(parents=True, exist_ok=True)
-    
-    # Create PDF
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=letter,
-        rightMargin=0.5*inch,
-        leftMargin=0.5*inch,
-        topMargin=0.5*inch,
-        bottomMargin=0.5*inch
-    )
+# Styles are built once at import rather than for every PDF
+_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Title'],
+    fontSize=16,
+    textColor=colors.HexColor('#1f4788'),
+    spaceAfter=12
+)
+_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=12,
+    textColor=colors.HexColor('#2e86ab'),
+    spaceAfter=6
+)
+_HEADER_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+_ASA_TABLE_STYLE = TableStyle([
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+])
+
+# Recently generated PDFs keyed by a hash of the case content, so asking for
+# the same unchanged case again reuses the file instead of rebuilding it
+_PDF_CACHE_SIZE = 64
+_pdf_cache: "OrderedDict[str, str]" = OrderedDict()
+_pdf_bytes_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+
+# Display formatters for date/time fields, applied once before building a PDF
+_DISPLAY_FORMATS = (
+    ('dob', format_date),
+    ('court_date', format_date),
+    ('applied_date', format_date),
+    ('appointed_date', format_date),
+    ('court_time', format_time),
+)
+
+def _display_values(case_data: Dict) -> Dict:
+    """Copy of case_data with date/time fields formatted for display"""
+    case_data = dict(case_data)
+    for key, formatter in _DISPLAY_FORMATS:
+        value = case_data.get(key)
+        if isinstance(value, (date, time)):
+            case_data[key] = formatter(value)
+    return case_data
+
+def _case_content_key(case_data: Dict) -> str:
+    """Hash the case fields as they are printed in the PDF"""
+    # A date object and its ISO string serialize alike but print differently,
+    # so values are hashed in their printed form
+    content = {
+        k: str(v) if isinstance(v, (date, time)) else v
+        for k, v in _display_values(case_data).items() if k != 'updated_at'
+    }
+    return hashlib.blake2b(json_dumps(content, sort_keys=True), digest_size=16).hexdigest()
+
+def _build_content(case_data: Dict) -> List:
+    """Build the flowables for a case opening sheet"""
+    # Format date/time values up front so everything below works on strings
+    case_data = _display_values(case_data)
     
     # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=16,
-        textColor=colors.HexColor('#1f4788'),
-        spaceAfter=12
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#2e86ab'),
-        spaceAfter=6
-    )
+    styles = _STYLES
+    title_style = _TITLE_STYLE
+    heading_style = _HEADING_STYLE
     
     # Build content
     content = []
@@ -57,11 +95,7 @@ def generate_case_pdf(case_data: Dict) -> str:
     ]
     
     header_table = Table(header_data, colWidths=[1.5*inch, 2*inch, 1*inch, 2*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-    ]))
+    header_table.setStyle(_HEADER_TABLE_STYLE)
     content.append(header_table)
     content.append(Spacer(1, 0.2*inch))
     
@@ -73,10 +107,7 @@ def generate_case_pdf(case_data: Dict) -> str:
     ]
     
     asa_table = Table(asa_data, colWidths=[0.5*inch, 2.5*inch, 0.5*inch, 1.5*inch, 0.5*inch, 2*inch])
-    asa_table.setStyle(TableStyle([
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-    ]))
+    asa_table.setStyle(_ASA_TABLE_STYLE)
     content.append(asa_table)
     content.append(Spacer(1, 0.3*inch))
     
@@ -87,11 +118,10 @@ def generate_case_pdf(case_data: Dict) -> str:
     # Defendant Name and DOB
     name = f"{case_data.get('last_name', '')} {case_data.get('first_name', '')} {case_data.get('middle_name', '')}"
     dob = case_data.get('dob', '')
-    if hasattr(dob, 'strftime'):
-        dob = dob.strftime('%m/%d/%Y')
     
-    content.append(Paragraph(f"<b>Name:</b> {name.strip()}", styles['Normal']))
-    content.append(Paragraph(f"<b>D.O.B.:</b> {dob}", styles['Normal']))
+    content.append(Paragraph(
+        f"<b>Name:</b> {name.strip()}<br/><b>D.O.B.:</b> {dob}", styles['Normal']
+    ))
     content.append(Spacer(1, 0.1*inch))
     
     # Address
@@ -100,8 +130,9 @@ def generate_case_pdf(case_data: Dict) -> str:
     state = case_data.get('state', '')
     zip_code = case_data.get('zip_code', '')
     
-    content.append(Paragraph(f"<b>Address:</b> {address}", styles['Normal']))
-    content.append(Paragraph(f"{city}, {state} {zip_code}", styles['Normal']))
+    content.append(Paragraph(
+        f"<b>Address:</b> {address}<br/>{city}, {state} {zip_code}", styles['Normal']
+    ))
     content.append(Spacer(1, 0.1*inch))
     
     # Phone
@@ -121,16 +152,10 @@ def generate_case_pdf(case_data: Dict) -> str:
     
     court_info = []
     if case_data.get('court_date'):
-        court_date = case_data['court_date']
-        if hasattr(court_date, 'strftime'):
-            court_date = court_date.strftime('%m/%d/%Y')
-        court_info.append(f"Court Date: {court_date}")
+        court_info.append(f"Court Date: {case_data['court_date']}")
     
     if case_data.get('court_time'):
-        court_time = case_data['court_time']
-        if hasattr(court_time, 'strftime'):
-            court_time = court_time.strftime('%I:%M %p')
-        court_info.append(f"Time: {court_time}")
+        court_info.append(f"Time: {case_data['court_time']}")
     
     if case_data.get('division'):
         court_info.append(f"Division: {case_data['division']}")
@@ -155,8 +180,9 @@ def generate_case_pdf(case_data: Dict) -> str:
     if actions:
         court_info.append(f"Actions: {', '.join(actions)}")
     
-    for info in court_info:
-        content.append(Paragraph(info, styles['Normal']))
+    # One paragraph per section keeps the number of flowables to parse small
+    if court_info:
+        content.append(Paragraph("<br/>".join(court_info), styles['Normal']))
     
     content.append(Spacer(1, 0.2*inch))
     
@@ -177,22 +203,26 @@ def generate_case_pdf(case_data: Dict) -> str:
     if case_data.get('physical_disabilities'):
         status_info.append("Physical Disabilities: Yes")
     
-    for info in status_info:
-        content.append(Paragraph(info, styles['Normal']))
+    if status_info:
+        content.append(Paragraph("<br/>".join(status_info), styles['Normal']))
     
     content.append(Spacer(1, 0.2*inch))
     
     # Case Information
     content.append(Paragraph("<b>Case Information</b>", heading_style))
     
+    case_info = []
     if case_data.get('case_number'):
-        content.append(Paragraph(f"Case No.: {case_data['case_number']}", styles['Normal']))
+        case_info.append(f"Case No.: {case_data['case_number']}")
     
     if case_data.get('case_type'):
-        content.append(Paragraph(f"Type: {case_data['case_type']}", styles['Normal']))
+        case_info.append(f"Type: {case_data['case_type']}")
     
     if case_data.get('charges'):
-        content.append(Paragraph(f"Charges: {case_data['charges']}", styles['Normal']))
+        case_info.append(f"Charges: {case_data['charges']}")
+    
+    if case_info:
+        content.append(Paragraph("<br/>".join(case_info), styles['Normal']))
     
     content.append(Spacer(1, 0.2*inch))
     
@@ -215,7 +245,67 @@ def generate_case_pdf(case_data: Dict) -> str:
     if case_data.get('reset_reason'):
         content.append(Paragraph(f"<b>Reset Because:</b> {case_data['reset_reason']}", styles['Normal']))
     
-    # Build PDF
-    doc.build(content)
+    return content
+
+def _pdf_filename(case_data: Dict) -> str:
+    """File name for a case PDF"""
+    defendant_name = f"{case_data.get('last_name', 'Unknown')}_{case_data.get('first_name', '')}"
+    case_number = case_data.get('case_number', 'no_case_number').replace('/', '_')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    return filename
\ No newline at end of file
+    return f"{defendant_name}_{case_number}_{timestamp}.pdf"
+
+def _build_pdf(case_data: Dict, target):
+    """Render the case opening sheet into a file name or file-like object"""
+    doc = SimpleDocTemplate(
+        target,
+        pagesize=letter,
+        rightMargin=0.5*inch,
+        leftMargin=0.5*inch,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch
+    )
+    doc.build(_build_content(case_data))
+
+def generate_case_pdf(case_data: Dict) -> str:
+    """Generate PDF from case data"""
+    cache_key = _case_content_key(case_data)
+    cached_path = _pdf_cache.get(cache_key)
+    if cached_path:
+        try:
+            if os.path.getsize(cached_path) > 0:
+                _pdf_cache.move_to_end(cache_key)
+                return cached_path
+        except OSError:
+            pass
+        del _pdf_cache[cache_key]
+    
+    # Create filename
+    filename = f"exports/pdfs/{_pdf_filename(case_data)}"
+    Path("exports/pdfs").mkdir(parents=True, exist_ok=True)
+    
+    _build_pdf(case_data, filename)
+    
+    _pdf_cache[cache_key] = filename
+    if len(_pdf_cache) > _PDF_CACHE_SIZE:
+        _pdf_cache.popitem(last=False)
+    
+    return filename
+
+def generate_case_pdf_bytes(case_data: Dict) -> Tuple[str, bytes]:
+    """Generate PDF from case data in memory; returns (file name, PDF bytes)"""
+    cache_key = _case_content_key(case_data)
+    cached = _pdf_bytes_cache.get(cache_key)
+    if cached:
+        _pdf_bytes_cache.move_to_end(cache_key)
+        return cached
+    
+    buffer = io.BytesIO()
+    _build_pdf(case_data, buffer)
+    result = (_pdf_filename(case_data), buffer.getvalue())
+    
+    _pdf_bytes_cache[cache_key] = result
+    if len(_pdf_bytes_cache) > _PDF_CACHE_SIZE:
+        _pdf_bytes_cache.popitem(last=False)
+    
+    return result
\ No newline at end of file
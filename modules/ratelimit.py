@@ -0,0 +1,53 @@
+"""
+Sliding-window rate limiting for the authentication forms
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+
+class SlidingWindow:
+    """Allows each key at most max_calls calls within any window of seconds"""
+    
+    # Above this many tracked keys, keys with no recent calls are dropped
+    MAX_IDLE_KEYS = 10_000
+    
+    def __init__(self, max_calls: int, window: float):
+        self.max_calls = max_calls
+        self.window = window
+        self._calls: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def retry_after(self, key: str) -> float:
+        """Record a call and return 0, or return the seconds to wait if key is over the limit"""
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls.get(key)
+            if calls is None:
+                if len(self._calls) >= self.MAX_IDLE_KEYS:
+                    self._drop_idle(now)
+                calls = self._calls[key] = deque()
+            
+            # Forget calls that have left the window
+            while calls and now - calls[0] >= self.window:
+                calls.popleft()
+            
+            if len(calls) >= self.max_calls:
+                return self.window - (now - calls[0])
+            calls.append(now)
+            return 0.0
+    
+    def allow(self, key: str) -> bool:
+        """Record a call and return whether it is within the limit"""
+        return self.retry_after(key) == 0
+    
+    def reset(self, key: str):
+        """Forget the calls recorded for key"""
+        with self._lock:
+            self._calls.pop(key, None)
+    
+    def _drop_idle(self, now: float):
+        """Forget keys whose calls have all left the window"""
+        for key in [k for k, calls in self._calls.items() if not calls or now - calls[-1] >= self.window]:
+            del self._calls[key]
\ No newline at end of file
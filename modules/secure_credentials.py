@@ -3,15 +3,51 @@ Secure credential storage for Case Opening Sheet Manager
 Only authorized users can decrypt and use SMTP credentials
 """
 import os
-import json
 import hashlib
+import hmac
 import secrets
 import getpass
+from datetime import datetime
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
+import logging
+from typing import Dict, Optional, Tuple
 import streamlit as st
+from modules.utils import json_dumps, json_loads
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+except ImportError:
+    # Argon2id needs cryptography 44 or newer; PBKDF2 is used otherwise
+    Argon2id = None
+
+logger = logging.getLogger(__name__)
+
+# KDF settings for credential files written before they were stored in the file
+LEGACY_KDF = {'algo': 'pbkdf2-sha256', 'iter': 100000}
+
+# Session state key of the session's derived Fernet keys, as
+# (salt, KDF settings, SHA-256 of master password) -> key. Only keys that
+# decrypted successfully are kept, so wrong guesses cannot grow it
+KEY_CACHE_SESSION_KEY = 'smtp_key_cache'
+
+# Parsed credential files keyed by absolute path, as
+# ((mtime_ns, size), storage dict, lowercased UTF-8 authorized emails)
+_storage_cache: Dict[str, tuple] = {}
+
+
+def _session_key_cache() -> Dict[Tuple, bytes]:
+    """Derived keys cached for the current session"""
+    return st.session_state.setdefault(KEY_CACHE_SESSION_KEY, {})
+
+
+def _email_in(email: str, allowed) -> bool:
+    """Whether email is one of the lowercased UTF-8 emails in allowed, compared in constant time"""
+    email = email.lower().encode()
+    # Every entry is compared, so the time taken does not show which one matched
+    return any([hmac.compare_digest(email, user) for user in allowed])
 
 
 class SecureCredentialManager:
@@ -20,25 +56,81 @@ class SecureCredentialManager:
     def __init__(self):
         self.credentials_file = 'data/smtp_credentials.enc'
         self.authorized_users = ['dkarpay@pd15.org']  # Only you can access
+        self._authorized_lower = frozenset(user.lower().encode() for user in self.authorized_users)
+        self.kdf = self._configured_kdf()
         
         # Ensure data directory exists
         import pathlib
         pathlib.Path('data').mkdir(exist_ok=True)
     
-    def _derive_key_from_password(self, password: str, salt: bytes) -> bytes:
+    def _configured_kdf(self) -> Dict:
+        """KDF settings for new credential files, from CRED_KDF and CRED_KDF_ITER"""
+        algo = os.environ.get('CRED_KDF', 'pbkdf2-sha256').lower()
+        if algo == 'argon2id':
+            if Argon2id is not None:
+                return {'algo': 'argon2id', 'iter': int(os.environ.get('CRED_KDF_ITER', '3')),
+                        'lanes': 4, 'memory_kib': 65536}
+            logger.warning("CRED_KDF=argon2id needs cryptography 44 or newer; using PBKDF2")
+        return {'algo': 'pbkdf2-sha256', 'iter': int(os.environ.get('CRED_KDF_ITER', '600000'))}
+    
+    def _key_cache_key(self, password: str, salt: bytes, kdf: Dict) -> Tuple:
+        """Key cache entry for a password, salt and KDF settings"""
+        return salt, tuple(sorted(kdf.items())), hashlib.sha256(password.encode()).digest()
+    
+    @staticmethod
+    def clear_key_cache():
+        """Forget the derived keys cached for the current session"""
+        st.session_state.pop(KEY_CACHE_SESSION_KEY, None)
+    
+    def _derive_key_from_password(self, password: str, salt: bytes,
+                                  kdf: Optional[Dict] = None) -> bytes:
         """Derive encryption key from user password"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+        kdf = kdf or self.kdf
+        
+        # Key derivation is deliberately slow; a master password that already
+        # worked is not derived again
+        cache_key = self._key_cache_key(password, salt, kdf)
+        key = _session_key_cache().get(cache_key)
+        if key is not None:
+            return key
+        
+        if kdf['algo'] == 'argon2id':
+            if Argon2id is None:
+                raise ValueError("Credentials use Argon2id, which needs cryptography 44 or newer")
+            deriver = Argon2id(salt=salt, length=32, iterations=kdf['iter'],
+                               lanes=kdf['lanes'], memory_cost=kdf['memory_kib'])
+        elif kdf['algo'] == 'pbkdf2-sha256':
+            # cryptography's bundled OpenSSL runs this about twice as fast as
+            # hashlib.pbkdf2_hmac on the system OpenSSL, so it is kept
+            deriver = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=kdf['iter'],
+            )
+        else:
+            raise ValueError(f"Unknown key derivation {kdf['algo']!r}")
+        key = base64.urlsafe_b64encode(deriver.derive(password.encode()))
         return key
     
+    def _load_storage(self) -> Tuple[Dict, frozenset]:
+        """Parsed credentials file and its authorized emails, re-read only when it changes"""
+        file_stat = os.stat(self.credentials_file)
+        stat_key = (file_stat.st_mtime_ns, file_stat.st_size)
+        cache_key = os.path.abspath(self.credentials_file)
+        cached = _storage_cache.get(cache_key)
+        if cached and cached[0] == stat_key:
+            return cached[1], cached[2]
+        
+        with open(self.credentials_file, 'rb') as f:
+            storage_data = json_loads(f.read())
+        allowed = frozenset(u.lower().encode() for u in storage_data.get('authorized_users', ()))
+        _storage_cache[cache_key] = (stat_key, storage_data, allowed)
+        return storage_data, allowed
+    
     def _is_authorized_user(self, email: str) -> bool:
         """Check if user is authorized to manage credentials"""
-        return email.lower() in [user.lower() for user in self.authorized_users]
+        return _email_in(email, self._authorized_lower)
     
     def setup_credentials(self, user_email: str, master_password: str, 
                          smtp_username: str, smtp_password: str) -> bool:
@@ -51,7 +143,7 @@ class SecureCredentialManager:
             salt = secrets.token_bytes(16)
             
             # Derive encryption key from master password
-            key = self._derive_key_from_password(master_password, salt)
+            key = self._derive_key_from_password(master_password, salt, self.kdf)
             fernet = Fernet(key)
             
             # Encrypt the SMTP credentials
@@ -62,17 +154,20 @@ class SecureCredentialManager:
                 'created_at': str(datetime.now())
             }
             
-            encrypted_data = fernet.encrypt(json.dumps(credentials).encode())
+            encrypted_data = fernet.encrypt(json_dumps(credentials))
             
             # Store encrypted credentials with salt
             storage_data = {
                 'salt': base64.b64encode(salt).decode(),
+                'kdf': self.kdf,
                 'encrypted_credentials': base64.b64encode(encrypted_data).decode(),
                 'authorized_users': self.authorized_users
             }
             
-            with open(self.credentials_file, 'w') as f:
-                json.dump(storage_data, f, indent=2)
+            with open(self.credentials_file, 'wb') as f:
+                f.write(json_dumps(storage_data, indent=True))
+            _storage_cache.pop(os.path.abspath(self.credentials_file), None)
+            _session_key_cache()[self._key_cache_key(master_password, salt, self.kdf)] = key
             
             return True, "✅ SMTP credentials encrypted and stored securely"
             
@@ -89,22 +184,25 @@ class SecureCredentialManager:
         
         try:
             # Load encrypted data
-            with open(self.credentials_file, 'r') as f:
-                storage_data = json.load(f)
+            storage_data, allowed = self._load_storage()
             
-            # Verify user is still authorized
-            if user_email.lower() not in [u.lower() for u in storage_data.get('authorized_users', [])]:
+            # Verify user is still authorized; the file usually lists the same
+            # users as this manager, which were already checked above
+            if allowed != self._authorized_lower and not _email_in(user_email, allowed):
                 return False, "❌ User no longer authorized", None, None
             
             # Decrypt credentials
             salt = base64.b64decode(storage_data['salt'])
             encrypted_data = base64.b64decode(storage_data['encrypted_credentials'])
             
-            key = self._derive_key_from_password(master_password, salt)
+            # Files record the KDF they were written with
+            kdf = storage_data.get('kdf', LEGACY_KDF)
+            key = self._derive_key_from_password(master_password, salt, kdf)
             fernet = Fernet(key)
             
             decrypted_data = fernet.decrypt(encrypted_data)
-            credentials = json.loads(decrypted_data.decode())
+            credentials = json_loads(decrypted_data)
+            _session_key_cache()[self._key_cache_key(master_password, salt, kdf)] = key
             
             return True, "✅ Credentials retrieved", credentials['smtp_username'], credentials['smtp_password']
             
@@ -201,7 +299,4 @@ class SecureCredentialManager:
                     st.sidebar.success("✅ SMTP credentials unlocked")
                     st.rerun()
                 else:
-                    st.sidebar.error(message)
-
-
-from datetime import datetime
\ No newline at end of file
+                    st.sidebar.error(message)
\ No newline at end of file
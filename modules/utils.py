@@ -2,13 +2,62 @@
 Utility functions for the Case Opening Sheet application
 """
 import re
-from datetime import datetime, date
-from typing import Optional, Union
+import json
+from collections import defaultdict
+from functools import lru_cache
+from datetime import datetime, date, time
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the standard library
+    orjson = None
+
+# Patterns compiled once at import
+_NON_DIGIT_RE = re.compile(r'\D')
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+# str.translate table deleting every ASCII character except 0-9
+_ASCII_NON_DIGITS = dict.fromkeys(i for i in range(128) if not chr(i).isdigit())
+# Characters not allowed in file names, all mapped to '_'
+_INVALID_FILENAME_CHARS = str.maketrans(dict.fromkeys('<>:"/\\|?*', '_'))
+# parse_date formats by separator, in the order they are tried
+_DASH_DATE_FORMATS = ("%Y-%m-%d", "%m-%d-%Y", "%d-%m-%Y")
+_SLASH_DATE_FORMATS = ("%m/%d/%Y", "%Y/%m/%d", "%d/%m/%Y")
+# Example pattern: YYYY-CF-XXXXXX or YYYY-MM-XXXXXX
+_CASE_NUMBER_RE = re.compile(r'^\d{4}-[A-Z]{2}-\d{6}$')
+
+def _json_default(obj):
+    """Serialize date/time values the same way orjson does"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def json_loads(data: Union[bytes, memoryview, str]) -> Any:
+    """Parse JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+def json_dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_json_default, option=option)
+    return json.dumps(
+        obj, indent=2 if indent else None, sort_keys=sort_keys, default=_json_default
+    ).encode()
 
 def format_phone(phone: str) -> str:
     """Format phone number to (XXX) XXX-XXXX"""
-    # Remove all non-numeric characters
-    digits = re.sub(r'\D', '', phone)
+    # Remove all non-numeric characters; translate covers the usual ASCII
+    # input, the regex keeps non-ASCII digits the same way as before
+    if phone.isascii():
+        digits = phone.translate(_ASCII_NON_DIGITS)
+    else:
+        digits = _NON_DIGIT_RE.sub('', phone)
     
     # Format based on length
     if len(digits) == 10:
@@ -23,15 +72,22 @@ def parse_date(date_str: str) -> Optional[date]:
     if not date_str:
         return None
     
-    # Try different date formats
-    formats = [
-        "%Y-%m-%d",
-        "%m/%d/%Y",
-        "%m-%d-%Y",
-        "%Y/%m/%d",
-        "%d/%m/%Y",
-        "%d-%m-%Y"
-    ]
+    # Fast path for ISO dates, the format the app stores
+    if (len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-'
+            and date_str.isascii() and date_str[:4].isdigit()
+            and date_str[5:7].isdigit() and date_str[8:].isdigit()):
+        try:
+            return date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:]))
+        except ValueError:
+            return None
+    
+    # Every format uses a single separator, so only try the ones that can match
+    if '-' in date_str:
+        formats = _DASH_DATE_FORMATS
+    elif '/' in date_str:
+        formats = _SLASH_DATE_FORMATS
+    else:
+        return None
     
     for fmt in formats:
         try:
@@ -41,16 +97,36 @@ def parse_date(date_str: str) -> Optional[date]:
     
     return None
 
+@lru_cache(maxsize=4096)
+def parse_iso_date(date_str: str) -> Optional[date]:
+    """Parse an ISO date string as stored in the database"""
+    # Cached because forms re-parse the same stored dates on every rerun
+    try:
+        return datetime.fromisoformat(date_str).date()
+    except (TypeError, ValueError):
+        return None
+
 def format_date(date_obj: Union[date, datetime, str]) -> str:
     """Format date object to MM/DD/YYYY string"""
     if isinstance(date_obj, str):
         return date_obj
     
-    if isinstance(date_obj, datetime):
-        return date_obj.strftime("%m/%d/%Y")
-    
+    # datetime is a date subclass; formatting the fields directly skips
+    # strftime's format parsing
     if isinstance(date_obj, date):
-        return date_obj.strftime("%m/%d/%Y")
+        return "%02d/%02d/%04d" % (date_obj.month, date_obj.day, date_obj.year)
+    
+    return ""
+
+def format_time(time_obj: Union[time, datetime, str]) -> str:
+    """Format time object to HH:MM AM/PM string"""
+    if isinstance(time_obj, str):
+        return time_obj
+    
+    # Same output as strftime('%I:%M %p') without parsing the format
+    if isinstance(time_obj, (time, datetime)):
+        hour = time_obj.hour
+        return "%02d:%02d %s" % (hour % 12 or 12, time_obj.minute, "AM" if hour < 12 else "PM")
     
     return ""
 
@@ -60,19 +136,15 @@ def validate_case_number(case_number: str) -> bool:
     if not case_number:
         return False
     
-    # Example pattern: YYYY-CF-XXXXXX or YYYY-MM-XXXXXX
-    pattern = r'^\d{4}-[A-Z]{2}-\d{6}$'
-    return bool(re.match(pattern, case_number.upper()))
+    return bool(_CASE_NUMBER_RE.match(case_number.upper()))
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe file system usage"""
     # Remove or replace invalid characters
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
+    filename = filename.translate(_INVALID_FILENAME_CHARS)
     
     # Remove multiple underscores
-    filename = re.sub(r'_+', '_', filename)
+    filename = _MULTI_UNDERSCORE_RE.sub('_', filename)
     
     # Limit length
     if len(filename) > 100:
@@ -91,9 +163,9 @@ def calculate_age(birth_date: Union[date, datetime]) -> int:
     today = date.today()
     age = today.year - birth_date.year
     
-    # Adjust for birthday not yet occurred this year
-    if (today.month, today.day) < (birth_date.month, birth_date.day):
-        age -= 1
+    # Adjust for birthday not yet occurred this year; days are below 32, so
+    # month * 32 + day orders dates within a year like (month, day) does
+    age -= (today.month * 32 + today.day) < (birth_date.month * 32 + birth_date.day)
     
     return age
 
@@ -126,32 +198,47 @@ def generate_case_summary(case_data: dict) -> str:
 
 def export_statistics(cases: list) -> dict:
     """Generate statistics from case list"""
-    stats = {
-        'total_cases': len(cases),
-        'in_custody': sum(1 for c in cases if c.get('in_custody')),
-        'on_probation': sum(1 for c in cases if c.get('on_probation')),
-        'veterans': sum(1 for c in cases if c.get('veteran')),
-        'mental_health': sum(1 for c in cases if c.get('mental_health_issues')),
-        'pending_charges': sum(1 for c in cases if c.get('pending_charges')),
-        'case_types': {},
-        'attorneys': {},
-        'divisions': {}
-    }
+    in_custody = on_probation = veterans = mental_health = pending_charges = 0
+    case_types = defaultdict(int)
+    attorneys = defaultdict(int)
+    divisions = defaultdict(int)
     
-    # Count case types
+    # One pass over the cases updates every counter
     for case in cases:
+        if case.get('in_custody'):
+            in_custody += 1
+        if case.get('on_probation'):
+            on_probation += 1
+        if case.get('veteran'):
+            veterans += 1
+        if case.get('mental_health_issues'):
+            mental_health += 1
+        if case.get('pending_charges'):
+            pending_charges += 1
+        
+        # Count case types
         case_type = case.get('case_type', 'Unknown')
-        stats['case_types'][case_type] = stats['case_types'].get(case_type, 0) + 1
+        case_types[case_type] += 1
         
         # Count attorneys
         attorney = case.get('attorney', 'Unassigned')
-        stats['attorneys'][attorney] = stats['attorneys'].get(attorney, 0) + 1
+        attorneys[attorney] += 1
         
         # Count divisions
         division = case.get('division', 'Unknown')
-        stats['divisions'][division] = stats['divisions'].get(division, 0) + 1
+        divisions[division] += 1
     
-    return stats
+    return {
+        'total_cases': len(cases),
+        'in_custody': in_custody,
+        'on_probation': on_probation,
+        'veterans': veterans,
+        'mental_health': mental_health,
+        'pending_charges': pending_charges,
+        'case_types': dict(case_types),
+        'attorneys': dict(attorneys),
+        'divisions': dict(divisions)
+    }
 
 def validate_required_fields(case_data: dict) -> tuple[bool, list]:
     """Validate required fields and return validation status and missing fields"""
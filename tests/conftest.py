@@ -93,24 +93,20 @@ def multiple_case_data():
 
 
 @pytest.fixture
-def mock_streamlit():
+def mock_streamlit(monkeypatch):
     """Mock Streamlit components for testing"""
-    with patch('streamlit.text_input') as mock_text_input, \
-         patch('streamlit.date_input') as mock_date_input, \
-         patch('streamlit.selectbox') as mock_selectbox, \
-         patch('streamlit.text_area') as mock_text_area:
-        
-        mock_text_input.return_value = "test_value"
-        mock_date_input.return_value = date.today()
-        mock_selectbox.return_value = "option1"
-        mock_text_area.return_value = "test text area"
-        
-        yield {
-            'text_input': mock_text_input,
-            'date_input': mock_date_input,
-            'selectbox': mock_selectbox,
-            'text_area': mock_text_area
-        }
+    # Plain mocks set with monkeypatch; patch() would introspect the module
+    # and build an autospec-ready mock for each widget
+    mocks = {
+        'text_input': Mock(return_value="test_value"),
+        'date_input': Mock(return_value=date.today()),
+        'selectbox': Mock(return_value="option1"),
+        'text_area': Mock(return_value="test text area")
+    }
+    for name, mock in mocks.items():
+        monkeypatch.setattr(f'streamlit.{name}', mock)
+    
+    yield mocks
 
 
 @pytest.fixture
@@ -153,6 +149,8 @@ def mock_auth_env():
 @pytest.fixture
 def freeze_time():
     """Fixture to freeze time for consistent testing"""
-    from freezegun import freeze_time
-    with freeze_time("2023-01-01 12:00:00"):
+    # time-machine changes the clock at the C level, so datetime.now() inside
+    # the block costs no more than usual, unlike freezegun's proxy classes
+    import time_machine
+    with time_machine.travel(datetime(2023, 1, 1, 12, 0, 0), tick=False):
         yield datetime(2023, 1, 1, 12, 0, 0)
\ No newline at end of file
@@ -1,6 +1,7 @@
 """
 Sample data fixtures for testing the Case Opening Sheet Manager
 """
+import pytest
 from datetime import datetime, date
 
 
@@ -107,8 +108,8 @@ SAMPLE_PDF_DATA = {
     }
 }
 
-# Phone number test cases
-PHONE_TEST_CASES = [
+# Phone number test cases, as pytest params with readable IDs
+PHONE_TEST_CASES = tuple(pytest.param(inp, expected, id=f"phone-{inp!r}") for inp, expected in [
     ("5551234567", "(555) 123-4567"),
     ("555-123-4567", "(555) 123-4567"),
     ("(555) 123-4567", "(555) 123-4567"),
@@ -118,10 +119,10 @@ PHONE_TEST_CASES = [
     ("123", "123"),  # Too short
     ("", ""),  # Empty
     ("abc123def", "123")  # Non-numeric chars removed
-]
+])
 
 # Date parsing test cases
-DATE_TEST_CASES = [
+DATE_TEST_CASES = tuple(pytest.param(inp, expected, id=f"date-{inp!r}") for inp, expected in [
     ("2023-01-15", date(2023, 1, 15)),
     ("01/15/2023", date(2023, 1, 15)),
     ("01-15-2023", date(2023, 1, 15)),
@@ -131,14 +132,14 @@ DATE_TEST_CASES = [
     ("invalid-date", None),
     ("", None),
     ("2023-13-45", None)  # Invalid date
-]
+])
 
 # Search test cases
-SEARCH_TEST_CASES = [
+SEARCH_TEST_CASES = tuple(pytest.param(query, expected, id=f"search-{query!r}") for query, expected in [
     ("john", ["case-123"]),  # First name match
     ("doe", ["case-123"]),   # Last name match
     ("23CF000123", ["case-123"]),  # Case number match
     ("smith", ["case-456"]),  # Different case
     ("nonexistent", []),      # No matches
     ("", ["case-123", "case-456", "case-789"])  # Empty search returns all
-]
\ No newline at end of file
+])
\ No newline at end of file
@@ -8,8 +8,10 @@ import hashlib
 import hmac
 import base64
 from unittest.mock import Mock, patch, mock_open, MagicMock
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from modules.auth import AuthManager
+import modules.auth as auth_module
 from fixtures.sample_data import SAMPLE_USERS, SAMPLE_PINS
 
 
@@ -66,7 +68,13 @@ class TestAuthManager:
         
         assert len(pin) == 6
         assert pin.isdigit()
-        assert 100000 <= int(pin) <= 999999
+        assert 0 <= int(pin) <= 999999
+    
+    def test_generate_pin_zero_padded(self):
+        """Test PINs with leading zeros keep six digits"""
+        auth = AuthManager()
+        with patch('modules.auth.secrets.randbelow', return_value=42):
+            assert auth._generate_pin() == "000042"
     
     def test_generate_jwt_token(self):
         """Test JWT token generation"""
@@ -359,4 +367,469 @@ class TestAuthManagerIntegration:
         with patch.dict(os.environ, env_vars):
             auth = AuthManager()
             
-            assert auth.jwt_secret == 'test-secret'
\ No newline at end of file
+            assert auth.jwt_secret == 'test-secret'
+
+
+class TestAuthStorage:
+    """Test cases for AuthManager's JSON storage"""
+    
+    @pytest.fixture
+    def auth(self, temp_dir, monkeypatch):
+        """AuthManager storing its files in a temporary directory"""
+        monkeypatch.chdir(temp_dir)
+        return AuthManager()
+    
+    def test_load_json_reuses_unchanged_file(self, auth):
+        """Test an unchanged file is parsed only once"""
+        auth._save_json(auth.users_file, {"user:a@pd15.org": {"id": "1"}})
+        
+        with patch('modules.auth.json_loads') as mock_load:
+            assert auth._load_json(auth.users_file) == {"user:a@pd15.org": {"id": "1"}}
+            assert AuthManager()._load_json(auth.users_file) == {"user:a@pd15.org": {"id": "1"}}
+            mock_load.assert_not_called()
+    
+    def test_load_json_sees_external_changes(self, auth):
+        """Test a file rewritten outside AuthManager is re-read"""
+        auth._save_json(auth.pins_file, {})
+        with open(auth.pins_file, 'w') as f:
+            json.dump({"pin:a@pd15.org": {"pin": "123456"}}, f)
+        
+        assert auth._load_json(auth.pins_file) == {"pin:a@pd15.org": {"pin": "123456"}}
+    
+    def test_load_json_returns_copies(self, auth):
+        """Test editing loaded data does not change what the next load returns"""
+        auth._save_json(auth.users_file, {"user:a@pd15.org": {"id": "1"}})
+        
+        users = auth._load_json(auth.users_file)
+        users["user:a@pd15.org"]["lastLogin"] = "now"
+        users["user:b@pd15.org"] = {"id": "2"}
+        
+        assert auth._load_json(auth.users_file) == {"user:a@pd15.org": {"id": "1"}}
+    
+    def test_load_json_invalid_file(self, auth):
+        """Test a corrupt file loads as empty"""
+        with open(auth.users_file, 'w') as f:
+            f.write("{not json")
+        
+        assert auth._load_json(auth.users_file) == {}
+    
+    def test_users_looked_up_by_email_key(self, auth):
+        """Test registration, login and PIN requests find users by their email key"""
+        with patch.object(auth, '_send_email', return_value=True):
+            assert auth.register_user("Jane.Doe@pd15.org", "secret", "Jane.Doe@pd15.org")[0]
+            code = auth._load_json(auth.pending_users_file)["pending:jane.doe@pd15.org"]["verificationCode"]
+            assert auth.verify_registration("jane.doe@pd15.org", code)[0]
+            
+            assert "user:jane.doe@pd15.org" in auth._load_json(auth.users_file)
+            assert auth.register_user("JANE.DOE@pd15.org", "other", "JANE.DOE@pd15.org") == (False, "Email already registered.")
+            assert auth.authenticate_user("JANE.DOE@PD15.ORG", "secret")[0] is True
+            assert auth.authenticate_user("jane.doe@pd15.org", "wrong")[0] is False
+            assert auth.authenticate_user("nobody@pd15.org", "secret")[0] is False
+            assert auth.request_login_pin("jane.doe@pd15.org")[0] is True
+            assert auth.request_login_pin("nobody@pd15.org") == (False, "Email address not found.")
+    
+    def test_password_hash_uses_pbkdf2(self, auth, monkeypatch):
+        """Test new hashes are PBKDF2 without argon2 and verify in constant time"""
+        monkeypatch.setattr(auth_module, '_password_hasher', None)
+        stored = auth._hash_password("secret", "salt")
+        
+        assert stored.startswith("pbkdf2_sha256$")
+        assert auth._verify_password("secret", "salt", stored) is True
+        assert auth._verify_password("wrong", "salt", stored) is False
+        assert auth._needs_rehash(stored) is False
+    
+    def test_password_hash_uses_argon2id(self, auth):
+        """Test new hashes are Argon2id when argon2-cffi is installed"""
+        pytest.importorskip("argon2")
+        stored = auth._hash_password("secret", "salt")
+        
+        assert stored.startswith("$argon2id$")
+        assert auth._verify_password("secret", "salt", stored) is True
+        assert auth._verify_password("wrong", "salt", stored) is False
+        assert auth._needs_rehash(stored) is False
+        assert auth._needs_rehash(f"pbkdf2_sha256${auth_module.PASSWORD_HASH_ITERATIONS}$00") is True
+    
+    def test_argon2_hash_without_argon2_rejected(self, auth, monkeypatch):
+        """Test an Argon2 hash fails verification instead of raising when argon2 is missing"""
+        monkeypatch.setattr(auth_module, '_password_hasher', None)
+        stored = "$argon2id$v=19$m=65536,t=2,p=1$c2FsdHNhbHQ$aGFzaGhhc2hoYXNoaGFzaA"
+        
+        assert auth._verify_password("secret", "salt", stored) is False
+    
+    def test_malformed_password_hash_rejected(self, auth):
+        """Test corrupt stored hashes fail verification instead of raising"""
+        for stored in ("pbkdf2_sha256$many$abcd", "pbkdf2_sha256$1000$not-hex", "not-hex", ""):
+            assert auth._verify_password("secret", "salt", stored) is False
+    
+    def test_legacy_hash_upgraded_on_login(self, auth):
+        """Test a SHA-256 hash from older versions still logs in and is upgraded"""
+        legacy = hashlib.sha256(("secret" + "salt").encode()).hexdigest()
+        auth._save_json(auth.users_file, {"user:jane@pd15.org": {
+            "id": "1", "username": "jane@pd15.org", "email": "jane@pd15.org",
+            "password": legacy, "salt": "salt", "verified": True
+        }})
+        
+        assert auth.authenticate_user("jane@pd15.org", "wrong")[0] is False
+        assert auth.authenticate_user("jane@pd15.org", "secret")[0] is True
+        
+        stored = auth._load_json(auth.users_file)["user:jane@pd15.org"]["password"]
+        assert stored != legacy and auth._needs_rehash(stored) is False
+        assert auth.authenticate_user("jane@pd15.org", "secret")[0] is True
+    
+    def test_jwt_roundtrip(self, auth):
+        """Test minted tokens carry the standard header and verify"""
+        token = auth._generate_jwt("user-1")
+        header = token.split('.')[0]
+        
+        assert json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))) == {"alg": "HS256", "typ": "JWT"}
+        assert auth._verify_jwt(token)["sub"] == "user-1"
+        assert auth._verify_jwt(token[:-2] + "xx") is None
+    
+    def test_allowed_email_domain(self, auth):
+        """Test only the office domains are accepted, case-insensitively"""
+        assert auth._is_allowed_email_domain("Jane@PD15.org") is True
+        assert auth._is_allowed_email_domain("jane@pd15.state.fl.us") is True
+        assert auth._is_allowed_email_domain("jane@gmail.com") is False
+        assert auth._is_allowed_email_domain("jane@pd15.org.evil.com") is False
+    
+    def test_verify_token_uses_id_index(self, auth):
+        """Test token verification finds users by id and follows file changes"""
+        users = {"user:jane@pd15.org": {"id": "u1", "username": "jane@pd15.org", "email": "jane@pd15.org", "verified": True}}
+        auth._save_json(auth.users_file, users)
+        token = auth._generate_jwt("u1")
+        
+        assert auth.verify_token(token) == {"id": "u1", "username": "jane@pd15.org", "email": "jane@pd15.org", "verified": True}
+        assert auth.verify_token(auth._generate_jwt("missing")) is None
+        
+        auth._save_json(auth.users_file, {})
+        assert auth.verify_token(token) is None
+    
+    def test_pin_login_updates_last_login(self, auth):
+        """Test a PIN login records the login time on the user"""
+        auth._save_json(auth.users_file, {"user:jane@pd15.org": {"id": "u1", "email": "jane@pd15.org"}})
+        with patch.object(auth, '_send_email', return_value=True):
+            auth.request_login_pin("jane@pd15.org")
+        pin = auth._load_json(auth.pins_file)["pin:jane@pd15.org"]["pin"]
+        
+        success, _, token = auth.verify_login_pin("jane@pd15.org", pin)
+        
+        assert success is True
+        assert auth._verify_jwt(token)["sub"] == "u1"
+        assert "lastLogin" in auth._load_json(auth.users_file)["user:jane@pd15.org"]
+    
+    def test_cleanup_expired_data_throttled(self, auth):
+        """Test expired records are swept, and sweeps run at most once per interval"""
+        auth._save_json(auth.pins_file, {"pin:old@pd15.org": {"expiry": 0}, "pin:new@pd15.org": {"expiry": 2 ** 62}})
+        auth._save_json(auth.pending_users_file, {"pending:old@pd15.org": {"codeExpiry": 0}})
+        
+        auth._cleanup_expired_data()
+        assert list(auth._load_json(auth.pins_file)) == ["pin:new@pd15.org"]
+        assert auth._load_json(auth.pending_users_file) == {}
+        
+        auth._save_json(auth.pins_file, {"pin:old@pd15.org": {"expiry": 0}})
+        with patch.object(auth, '_save_json') as mock_save:
+            auth._cleanup_expired_data()
+            mock_save.assert_not_called()
+    
+    @patch('modules.auth.smtplib.SMTP')
+    def test_smtp_connection_reused(self, mock_smtp, auth):
+        """Test emails reuse a pooled SMTP login and reconnect after a disconnect"""
+        auth_module._close_smtp()
+        first, second = MagicMock(), MagicMock()
+        mock_smtp.side_effect = [first, second]
+        env = {'SMTP_USERNAME': 'sender@pd15.org', 'SMTP_PASSWORD': 'pw', 'EMAIL_MOCK_MODE': 'false'}
+        
+        with patch.dict(os.environ, env):
+            assert auth._send_email("a@pd15.org", "Subject", "Body") is True
+            assert auth._send_email("b@pd15.org", "Subject", "Body") is True
+            assert mock_smtp.call_count == 1
+            assert first.login.call_count == 1
+            assert first.sendmail.call_count == 2
+            
+            first.sendmail.side_effect = auth_module.smtplib.SMTPServerDisconnected()
+            assert auth._send_email("c@pd15.org", "Subject", "Body") is True
+            assert mock_smtp.call_count == 2
+            second.sendmail.assert_called_once()
+        
+        auth_module._close_smtp()
+        second.quit.assert_called_once()
+    
+    def test_jwt_accepts_tokens_from_older_versions(self, auth):
+        """Test tokens minted with spaced JSON payloads still verify"""
+        def b64(data):
+            return base64.urlsafe_b64encode(data).decode().rstrip('=')
+        
+        header = b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+        payload = b64(json.dumps({"sub": "u1", "iat": 1, "exp": 2 ** 40}).encode())
+        signature = hmac.new(auth.jwt_secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        
+        assert auth._verify_jwt(f"{header}.{payload}.{b64(signature)}")["sub"] == "u1"
+        assert auth._verify_jwt(f"{header}.{payload}") is None
+    
+    def test_initialize_storage_once(self, auth):
+        """Test storage files are created once and never overwritten"""
+        for file_path in (auth.users_file, auth.pending_users_file, auth.pins_file):
+            assert auth._load_json(file_path) == {}
+        
+        auth._save_json(auth.users_file, {"user:a@pd15.org": {"id": "1"}})
+        with patch('builtins.open') as mock_file:
+            AuthManager()
+            mock_file.assert_not_called()
+        
+        auth_module._initialized_storage.clear()
+        AuthManager()
+        assert auth._load_json(auth.users_file) == {"user:a@pd15.org": {"id": "1"}}
+    
+    def test_jwt_rejects_other_algorithms(self, auth):
+        """Test tokens with a header other than HS256 are rejected even if signed"""
+        def b64(data):
+            return base64.urlsafe_b64encode(data).decode().rstrip('=')
+        
+        header = b64(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+        payload = auth._generate_jwt("u1").split('.')[1]
+        signature = hmac.new(auth.jwt_secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        
+        assert auth._verify_jwt(f"{header}.{payload}.{b64(signature)}") is None
+        assert auth._verify_jwt(f"{header}.{payload}.") is None
+    
+    def test_save_json_replaces_file_atomically(self, auth):
+        """Test saves swap in a complete file and leave no temporary behind"""
+        auth._save_json(auth.users_file, {"user:a@pd15.org": {"id": "1"}})
+        
+        with patch('modules.auth.os.replace', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                auth._save_json(auth.users_file, {})
+        
+        assert auth._load_json(auth.users_file) == {"user:a@pd15.org": {"id": "1"}}
+        
+        auth._save_json(auth.users_file, {})
+        assert not [name for name in os.listdir(os.path.dirname(auth.users_file)) if name.endswith(".tmp")]
+    
+    def test_concurrent_saves_do_not_collide(self, auth):
+        """Test saves of the same file from several threads each swap in their own temporary file"""
+        def save_pins(n):
+            for i in range(50):
+                auth._save_json(auth.pins_file, {f"pin:{n}-{i}@pd15.org": {"expiry": 0}})
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            # Any error in a thread is raised again by result()
+            for future in [executor.submit(save_pins, n) for n in range(4)]:
+                future.result()
+        
+        assert len(auth._load_json(auth.pins_file)) == 1
+        assert not [name for name in os.listdir(os.path.dirname(auth.pins_file)) if name.endswith(".tmp")]
+    
+    def test_codes_compared_in_constant_time(self, auth):
+        """Test PIN and verification code checks use compare_digest and reject odd input"""
+        auth._save_json(auth.pins_file, {"pin:jane@pd15.org": {"pin": "012345", "expiry": 2**53, "userId": "u1"}})
+        
+        assert auth.verify_login_pin("jane@pd15.org", "ü12345") == (False, "Invalid PIN.", None)
+        assert auth.verify_login_pin("jane@pd15.org", "") == (False, "Invalid PIN.", None)
+        with patch('modules.auth.hmac.compare_digest', return_value=False) as mock_compare:
+            assert auth.verify_login_pin("jane@pd15.org", "012345")[0] is False
+            mock_compare.assert_called_once_with(b"012345", b"012345")
+    
+    def test_pin_expiry_in_integer_milliseconds(self, auth):
+        """Test PIN expiry is stored as an exact integer millisecond timestamp"""
+        auth._save_json(auth.users_file, {"user:jane@pd15.org": {"id": "u1", "email": "jane@pd15.org"}})
+        with patch('modules.auth.time.time_ns', return_value=1_700_000_000_123_456_789), \
+             patch.object(auth, '_send_email', return_value=True):
+            auth.request_login_pin("jane@pd15.org")
+        
+        assert auth._load_json(auth.pins_file)["pin:jane@pd15.org"]["expiry"] == 1_700_000_000_123 + 5 * 60 * 1000
+    
+    def test_verify_sweeps_expired_in_one_write(self, auth):
+        """Test verifying drops other expired PINs with a single write"""
+        auth._save_json(auth.users_file, {"user:jane@pd15.org": {"id": "u1", "email": "jane@pd15.org"}})
+        auth._save_json(auth.pins_file, {
+            "pin:jane@pd15.org": {"pin": "123456", "expiry": 2 ** 62, "userId": "u1"},
+            "pin:old@pd15.org": {"pin": "000000", "expiry": 0, "userId": "u2"},
+        })
+        
+        with patch.object(auth, '_save_json', wraps=auth._save_json) as mock_save:
+            assert auth.verify_login_pin("jane@pd15.org", "654321") == (False, "Invalid PIN.", None)
+            mock_save.assert_called_once()
+        assert list(auth._load_json(auth.pins_file)) == ["pin:jane@pd15.org"]
+        
+        auth._save_json(auth.pending_users_file, {"pending:old@pd15.org": {"codeExpiry": 0}})
+        assert auth.verify_registration("old@pd15.org", "123456") == (
+            False, "Verification code has expired. Please register again."
+        )
+        assert auth._load_json(auth.pending_users_file) == {}
+    
+    @patch('modules.auth.smtplib.SMTP')
+    def test_smtp_pool_bounded(self, mock_smtp, auth):
+        """Test the SMTP pool keeps at most SMTP_POOL_SIZE idle connections"""
+        auth_module._close_smtp()
+        connections = [MagicMock(), MagicMock()]
+        mock_smtp.side_effect = connections
+        
+        with patch.object(auth_module, 'SMTP_POOL_SIZE', 1):
+            auth_module._smtp_sendmail("smtp", 587, "old@pd15.org", "pw", "a@pd15.org", "Body")
+            auth_module._smtp_sendmail("smtp", 587, "new@pd15.org", "pw", "a@pd15.org", "Body")
+        
+        connections[0].quit.assert_called_once()
+        assert [c for _, c in auth_module._smtp_pool] == [connections[1]]
+        auth_module._close_smtp()
+    
+    @patch('modules.auth._smtp_sendmail')
+    def test_pin_email_sent_in_background(self, mock_sendmail, auth):
+        """Test requesting a PIN does not wait on SMTP, and send failures are logged"""
+        auth._save_json(auth.users_file, {"user:jane@pd15.org": {"id": "u1", "email": "jane@pd15.org"}})
+        env = {'SMTP_USERNAME': 'sender@pd15.org', 'SMTP_PASSWORD': 'pw', 'EMAIL_MOCK_MODE': 'false'}
+        mock_sendmail.side_effect = auth_module.smtplib.SMTPException("refused")
+        executor = ThreadPoolExecutor(max_workers=1)
+        
+        with patch.dict(os.environ, env), \
+             patch.object(auth_module, '_email_executor', executor), \
+             patch.object(auth_module.logger, 'error') as mock_log:
+            assert auth.request_login_pin("jane@pd15.org") == (True, "PIN sent to your email address.")
+            executor.shutdown(wait=True)
+        
+        mock_sendmail.assert_called_once()
+        mock_log.assert_called_once()
+    
+    @patch('modules.auth.st')
+    def test_mock_email_shows_code(self, mock_st, auth):
+        """Test mock mode shows the PIN or code found in the email"""
+        with patch.dict(os.environ, {'EMAIL_MOCK_MODE': 'true'}):
+            assert auth._send_email("a@pd15.org", "PIN", "Your login PIN is: 012345") is True
+            assert auth._send_email("a@pd15.org", "Code", "Verification Code: 654321") is True
+        
+        shown = [c[0][0] for c in mock_st.info.call_args_list]
+        assert any("012345" in text for text in shown)
+        assert any("654321" in text for text in shown)
+    
+    def test_hot_stores_written_compact(self, auth):
+        """Test PINs and pending users are compact JSON while users.json stays indented"""
+        record = {"id": "1", "expiry": 2 ** 62}
+        for file_path in (auth.users_file, auth.pins_file, auth.pending_users_file):
+            auth._save_json(file_path, {"key": record})
+        
+        with open(auth.users_file, 'rb') as f:
+            assert b"\n" in f.read()
+        for file_path in (auth.pins_file, auth.pending_users_file):
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            assert json.loads(content) == {"key": record}
+            assert b"\n" not in content and b" " not in content
+    
+    def test_sha_extensions_detected_from_cpuinfo(self):
+        """Test SHA instruction support is read from cpuinfo and warned about once"""
+        cpuinfo = {
+            "flags\t\t: fpu sse2 sha_ni avx2\n": True,
+            "Features\t: fp asimd sha1 sha2\n": True,
+            "flags\t\t: fpu sse2 avx2\n": False,
+            "processor\t: 0\n": None,
+        }
+        for content, expected in cpuinfo.items():
+            auth_module.sha_extensions_available.cache_clear()
+            with patch('builtins.open', mock_open(read_data=content)), \
+                 patch.object(auth_module.logger, 'warning') as mock_warning:
+                assert auth_module.sha_extensions_available() is expected
+                assert auth_module.sha_extensions_available() is expected
+                assert mock_warning.call_count == (1 if expected is False else 0)
+        auth_module.sha_extensions_available.cache_clear()
+    
+    def test_jwt_signing_follows_secret_changes(self, auth):
+        """Test the cached HMAC key is rebuilt when the JWT secret changes"""
+        message = b"header.payload"
+        assert auth._sign_jwt(message) == hmac.new(auth.jwt_secret.encode(), message, hashlib.sha256).digest()
+        token = auth._generate_jwt("u1")
+        
+        auth.jwt_secret = "rotated-secret"
+        assert auth._sign_jwt(message) == hmac.new(b"rotated-secret", message, hashlib.sha256).digest()
+        assert auth._verify_jwt(token) is None
+        assert auth._verify_jwt(auth._generate_jwt("u1"))["sub"] == "u1"
+
+
+class TestSQLiteAuthStore:
+    """Test cases for AuthManager with the SQLite storage backend"""
+    
+    @pytest.fixture
+    def auth(self, temp_dir, monkeypatch):
+        """AuthManager storing its records in a temporary SQLite database"""
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setenv('AUTH_DB_BACKEND', 'sqlite')
+        return AuthManager()
+    
+    def test_register_verify_and_login(self, auth):
+        """Test the full registration and login flow on SQLite"""
+        with patch.object(auth, '_send_email', return_value=True):
+            assert auth.register_user("jane@pd15.org", "Secret123!", "jane@pd15.org")[0]
+        code = auth._load_json(auth.pending_users_file)["pending:jane@pd15.org"]["verificationCode"]
+        
+        assert auth.verify_registration("jane@pd15.org", code)[0]
+        success, _, token = auth.authenticate_user("Jane@pd15.org", "Secret123!")
+        
+        assert success is True
+        assert auth.verify_token(token)["email"] == "jane@pd15.org"
+        assert not os.path.exists(auth.users_file)
+        assert os.path.exists(auth.auth_db_file)
+    
+    def test_save_writes_only_changed_records(self, auth):
+        """Test a save upserts changed records and deletes removed ones only"""
+        users = {f"user:u{i}@pd15.org": {"id": str(i)} for i in range(50)}
+        auth._save_json(auth.users_file, users)
+        
+        users = auth._load_json(auth.users_file)
+        users["user:u1@pd15.org"]["lastLogin"] = "2024-01-01T00:00:00"
+        del users["user:u2@pd15.org"]
+        before = auth.store._conn.total_changes
+        auth._save_json(auth.users_file, users)
+        
+        assert auth.store._conn.total_changes - before == 2
+        assert auth._load_json(auth.users_file) == users
+    
+    def test_sees_writes_from_other_connections(self, auth):
+        """Test a cached table reloads after another connection commits"""
+        assert auth._read_json(auth.pins_file) == {}
+        
+        other = auth_module.SQLiteAuthStore(auth.auth_db_file)
+        other.save('login_pins', {"pin:jane@pd15.org": {"pin": "123456"}})
+        
+        assert auth._read_json(auth.pins_file) == {"pin:jane@pd15.org": {"pin": "123456"}}
+    
+    def test_imports_existing_json(self, temp_dir, monkeypatch):
+        """Test existing JSON records are imported into an empty database"""
+        monkeypatch.chdir(temp_dir)
+        os.makedirs("data", exist_ok=True)
+        with open("data/users.json", "w") as f:
+            json.dump({"user:jane@pd15.org": {"id": "u1", "email": "jane@pd15.org"}}, f)
+        
+        monkeypatch.setenv('AUTH_DB_BACKEND', 'sqlite')
+        auth = AuthManager()
+        
+        assert auth._find_user_by_id("u1")[0] == "user:jane@pd15.org"
+        assert auth._read_json(auth.pins_file) == {}
+    
+    def test_cleanup_deletes_expired_in_sql(self, auth):
+        """Test the periodic sweep deletes expired rows with a single statement"""
+        auth._save_json(auth.pins_file, {
+            "pin:old@pd15.org": {"pin": "000000", "expiry": 0},
+            "pin:new@pd15.org": {"pin": "123456", "expiry": 2 ** 62},
+        })
+        auth._save_json(auth.pending_users_file, {"pending:old@pd15.org": {"codeExpiry": 1}})
+        auth_module._last_cleanup.clear()
+        
+        with patch.object(auth, '_load_json') as mock_load:
+            auth._cleanup_expired_data()
+            mock_load.assert_not_called()
+        
+        assert list(auth._read_json(auth.pins_file)) == ["pin:new@pd15.org"]
+        assert auth._read_json(auth.pending_users_file) == {}
+    
+    def test_verify_registration_single_transaction(self, auth):
+        """Test verifying moves the user between tables in one commit"""
+        with patch.object(auth, '_send_email', return_value=True):
+            auth.register_user("jane@pd15.org", "Secret123!", "jane@pd15.org")
+        code = auth._read_json(auth.pending_users_file)["pending:jane@pd15.org"]["verificationCode"]
+        
+        with patch.object(auth.store, 'save', wraps=auth.store.save) as mock_save, \
+             patch.object(auth.store, 'save_tables', wraps=auth.store.save_tables) as mock_save_tables:
+            assert auth.verify_registration("jane@pd15.org", code)[0]
+            mock_save.assert_not_called()
+            mock_save_tables.assert_called_once()
+        
+        assert "user:jane@pd15.org" in auth._read_json(auth.users_file)
+        assert auth._read_json(auth.pending_users_file) == {}
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Unit tests for the authentication UI
+"""
+import pytest
+from streamlit.testing.v1 import AppTest
+
+
+def _user_info_app():
+    """Signed-in session with the PIN login state and unlocked SMTP credentials"""
+    import streamlit as st
+    from modules.auth_ui import show_user_info
+    
+    if 'started' not in st.session_state:
+        st.session_state.started = True
+        st.session_state.authenticated = True
+        st.session_state.auth_token = "token"
+        st.session_state.user_info = {'email': 'jane.doe@pd15.org'}
+        st.session_state.pin_requested = True
+        st.session_state.pin_email_stored = 'jane.doe@pd15.org'
+        st.session_state.smtp_unlocked = True
+        st.session_state.smtp_username = 'smtp@pd15.org'
+        st.session_state.smtp_password = 'smtp_secret'
+        st.session_state.smtp_key_cache = {('salt',): b'key'}
+    show_user_info()
+
+
+class TestShowUserInfo:
+    """Test cases for the sidebar user info and logout button"""
+    
+    def test_logout_clears_session(self):
+        """Test logout signs the user out and drops PIN state, unlocked SMTP credentials and derived keys"""
+        at = AppTest.from_function(_user_info_app).run()
+        assert at.session_state.smtp_password == 'smtp_secret'
+        
+        at.sidebar.button[0].click().run()
+        
+        assert not at.exception
+        assert at.session_state.authenticated is False
+        assert at.session_state.user_info is None
+        for key in ('pin_requested', 'pin_email_stored', 'smtp_unlocked', 'smtp_username', 'smtp_password',
+                    'smtp_key_cache'):
+            assert key not in at.session_state
\ No newline at end of file
@@ -3,9 +3,13 @@ Unit tests for the CaseDatabase module
 """
 import pytest
 import json
+import mmap
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from unittest.mock import patch, mock_open
-from modules.database import CaseDatabase
+from modules.database import CaseDatabase, SQLiteCaseDatabase
 from fixtures.sample_data import SAMPLE_CASES
 
 
@@ -234,4 +238,334 @@ class TestCaseDatabase:
         # Verify order
         expected_ids = ["case-123", "case-456", "case-789"]
         actual_ids = [case["id"] for case in all_cases]
-        assert actual_ids == expected_ids
\ No newline at end of file
+        assert actual_ids == expected_ids
+    
+    def test_add_case_appends_to_journal(self, case_database):
+        """Test that adding a case appends to the journal instead of rewriting the snapshot"""
+        snapshot_before = case_database.db_path.read_text()
+        
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        
+        assert case_database.db_path.read_text() == snapshot_before
+        journal_lines = case_database.log_path.read_text().splitlines()
+        assert len(journal_lines) == 1
+        assert json.loads(journal_lines[0])["id"] == "case-123"
+    
+    def test_compact_folds_journal_into_snapshot(self, case_database):
+        """Test that compaction writes live cases to the snapshot and clears the journal"""
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.add_case(SAMPLE_CASES["minimal_case"].copy())
+        case_database.delete_case("case-123")
+        
+        case_database.compact()
+        
+        with open(case_database.db_path) as f:
+            snapshot = json.load(f)
+        assert [case["id"] for case in snapshot] == ["case-456"]
+        assert case_database.log_path.read_text() == ""
+        assert [case["id"] for case in case_database.get_all_cases()] == ["case-456"]
+    
+    def test_journal_compacts_automatically(self, case_database):
+        """Test that a long journal is compacted once it outgrows the live cases"""
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        case_database.add_case(case_data)
+        
+        for i in range(150):
+            case_data["notes"] = f"Revision {i}"
+            case_database.update_case("case-123", case_data)
+        
+        assert len(case_database.log_path.read_text().splitlines()) < 100
+        assert case_database.get_case("case-123")["notes"] == "Revision 149"
+        assert CaseDatabase(case_database.db_path).get_case("case-123")["notes"] == "Revision 149"
+    
+    def test_snapshot_parse_shared_between_instances(self, case_database):
+        """Test that a new instance reuses the parsed snapshot when the file is unchanged"""
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.compact()
+        
+        with patch('modules.database.json_loads') as mock_load:
+            db = CaseDatabase(case_database.db_path)
+            assert db.get_case("case-123") is not None
+            mock_load.assert_not_called()
+    
+    def test_snapshot_cache_invalidated_on_change(self, case_database):
+        """Test that an externally modified snapshot is re-read"""
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.compact()
+        
+        with open(case_database.db_path, 'w') as f:
+            json.dump([SAMPLE_CASES["minimal_case"], SAMPLE_CASES["invalid_case"]], f)
+        
+        cases = CaseDatabase(case_database.db_path).get_all_cases()
+        assert [case["id"] for case in cases] == ["case-456", "case-789"]
+        assert case_database.get_case("case-123") is None
+    
+    def test_add_case_with_date_values(self, case_database):
+        """Test that date values from the forms are stored as ISO strings"""
+        case_data = SAMPLE_CASES["minimal_case"].copy()
+        case_data["dob"] = date(1990, 1, 15)
+        
+        assert case_database.add_case(case_data) is True
+        assert case_database.get_case("case-456")["dob"] == "1990-01-15"
+    
+    def test_load_large_snapshot_via_mmap(self, temp_db_path):
+        """Test that snapshots above the mmap threshold load correctly"""
+        with open(temp_db_path, 'w') as f:
+            json.dump([SAMPLE_CASES["complete_case"], SAMPLE_CASES["minimal_case"]], f)
+        
+        with patch('modules.database.MMAP_THRESHOLD', 0), \
+             patch('modules.database.mmap.mmap', wraps=mmap.mmap) as mock_mmap:
+            db = CaseDatabase(temp_db_path)
+            assert [case["id"] for case in db.get_all_cases()] == ["case-123", "case-456"]
+            mock_mmap.assert_called_once()
+    
+    def test_export_to_csv(self, case_database, temp_dir):
+        """Test exporting all cases to CSV with a column for every field"""
+        import csv
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.add_case(SAMPLE_CASES["minimal_case"].copy())
+        
+        csv_path = os.path.join(temp_dir, "export.csv")
+        case_database.export_to_csv(csv_path)
+        
+        with open(csv_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row["id"] for row in rows] == ["case-123", "case-456"]
+        assert rows[0]["charges"] == "Battery, Assault"
+        assert rows[1]["charges"] == ""
+    
+    def test_export_to_csv_empty(self, case_database, temp_dir):
+        """Test that exporting an empty database writes nothing"""
+        csv_path = os.path.join(temp_dir, "export.csv")
+        case_database.export_to_csv(csv_path)
+        
+        assert not os.path.exists(csv_path)
+    
+    def test_iter_csv_yields_rows(self, case_database):
+        """Test that CSV export is produced one row at a time"""
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.add_case(SAMPLE_CASES["minimal_case"].copy())
+        
+        chunks = list(case_database.iter_csv())
+        assert len(chunks) == 2
+        assert chunks[0].startswith("address,")
+        assert "case-456" in chunks[1]
+    
+    def test_get_cases_by_status(self, case_database):
+        """Test status lookups follow adds, updates and deletes"""
+        custody_case = SAMPLE_CASES["complete_case"].copy()
+        custody_case["in_custody"] = True
+        veteran_case = SAMPLE_CASES["minimal_case"].copy()
+        veteran_case["veteran"] = True
+        case_database.add_case(custody_case)
+        case_database.add_case(veteran_case)
+        
+        assert [c["id"] for c in case_database.get_cases_by_status("In Custody")] == ["case-123"]
+        assert [c["id"] for c in case_database.get_cases_by_status("veteran")] == ["case-456"]
+        assert case_database.get_cases_by_status("On Probation") == []
+        assert case_database.get_cases_by_status("unknown status") == []
+        
+        custody_case["in_custody"] = False
+        custody_case["on_probation"] = True
+        case_database.update_case("case-123", custody_case)
+        assert case_database.get_cases_by_status("in custody") == []
+        assert [c["id"] for c in case_database.get_cases_by_status("on probation")] == ["case-123"]
+        
+        case_database.delete_case("case-456")
+        assert case_database.get_cases_by_status("veteran") == []
+        
+        # Indexes are rebuilt from disk by a fresh instance
+        db = CaseDatabase(case_database.db_path)
+        assert [c["id"] for c in db.get_cases_by_status("on probation")] == ["case-123"]
+    
+    def test_search_cases_follows_updates(self, case_database):
+        """Test that search reflects updated and deleted cases"""
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        case_database.add_case(case_data)
+        
+        case_data["charges"] = "Grand Theft"
+        case_database.update_case("case-123", case_data)
+        assert case_database.search_cases("battery") == []
+        assert [c["id"] for c in case_database.search_cases("grand theft")] == ["case-123"]
+        
+        case_database.delete_case("case-123")
+        assert case_database.search_cases("theft") == []
+    
+    def test_search_cases_does_not_match_across_fields(self, case_database):
+        """Test that a term spanning two fields is not a match"""
+        case_database.add_case(SAMPLE_CASES["minimal_case"].copy())
+        
+        assert case_database.search_cases("janesmith") == []
+        assert "asa" not in case_database.get_case("case-456")
+    
+    def test_version_changes_on_write(self, case_database):
+        """Test that the version token changes with every mutation"""
+        versions = [case_database.version()]
+        
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        versions.append(case_database.version())
+        case_database.update_case("case-123", SAMPLE_CASES["complete_case"].copy())
+        versions.append(case_database.version())
+        case_database.compact()
+        versions.append(case_database.version())
+        
+        assert len(set(versions)) == len(versions)
+        assert case_database.version() == versions[-1]
+    
+    def test_save_is_atomic(self, case_database, temp_db_path):
+        """Test a failed save leaves the previous snapshot in place"""
+        case_database.add_case(SAMPLE_CASES["complete_case"].copy())
+        case_database.compact()
+        with open(temp_db_path, 'rb') as f:
+            before = f.read()
+        
+        with patch('modules.database.os.replace', side_effect=OSError("disk full")):
+            case_database._save_data([])
+        
+        with open(temp_db_path, 'rb') as f:
+            assert f.read() == before
+        assert not os.path.exists(temp_db_path + '.tmp')
+        assert CaseDatabase(temp_db_path).get_case("case-123") is not None
+    
+    def test_save_keeps_entries_appended_by_another_instance(self, temp_db_path):
+        """Test replacing the snapshot keeps journal entries this instance has not seen"""
+        db_a = CaseDatabase(temp_db_path)
+        db_a.add_case({"id": "a"})
+        db_b = CaseDatabase(temp_db_path)
+        db_b.add_case({"id": "b"})
+        
+        # db_a last synced before db_b's write
+        db_a._save_data([{"id": "a"}])
+        
+        assert [case["id"] for case in CaseDatabase(temp_db_path).get_all_cases()] == ["a", "b"]
+        assert [case["id"] for case in db_a.get_all_cases()] == ["a", "b"]
+    
+    def test_concurrent_writers_lose_no_cases(self, temp_db_path):
+        """Test cases added by several instances survive each other's compactions"""
+        def add_cases(n):
+            db = CaseDatabase(temp_db_path)
+            for i in range(40):
+                assert db.add_case({"id": f"{n}-{i}"}) is True
+        
+        with patch('modules.database.COMPACT_MIN_ENTRIES', 5), \
+             patch('modules.database.COMPACT_RATIO', 0.0), \
+             ThreadPoolExecutor(max_workers=4) as executor:
+            for future in [executor.submit(add_cases, n) for n in range(4)]:
+                future.result()
+        
+        assert len(CaseDatabase(temp_db_path).get_all_cases()) == 160
+    
+    def test_returned_cases_are_copies(self, case_database):
+        """Test changing a returned case does not change what other instances see"""
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        case_data["in_custody"] = True
+        case_data["tags"] = ["priority"]
+        case_database.add_case(case_data)
+        case_database.compact()
+        other = CaseDatabase(case_database.db_path)
+        
+        for case in (case_database.get_case("case-123"), case_database.get_all_cases()[0],
+                     case_database.search_cases("doe")[0], case_database.get_cases_by_status("in custody")[0]):
+            case["charges"] = "Edited in place"
+            case["tags"].append("edited")
+        
+        for db in (case_database, other):
+            assert db.get_case("case-123")["charges"] == "Battery, Assault"
+            assert db.get_case("case-123")["tags"] == ["priority"]
+
+class TestSQLiteCaseDatabase:
+    """Test cases for the SQLiteCaseDatabase class"""
+    
+    @pytest.fixture
+    def sqlite_db(self, temp_dir):
+        """SQLite database in a temporary directory"""
+        return SQLiteCaseDatabase(os.path.join(temp_dir, "test_cases.db"))
+    
+    def test_add_and_get_case(self, sqlite_db):
+        """Test adding a case and reading it back"""
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        assert sqlite_db.add_case(case_data) is True
+        
+        assert sqlite_db.get_case("case-123") == case_data
+        assert sqlite_db.get_case("missing") is None
+    
+    def test_update_keeps_order(self, sqlite_db):
+        """Test updating a case keeps its position and rejects unknown ids"""
+        for i in range(3):
+            sqlite_db.add_case({"id": f"case-{i}", "last_name": f"Name{i}"})
+        
+        assert sqlite_db.update_case("case-0", {"id": "case-0", "last_name": "Renamed"}) is True
+        assert sqlite_db.update_case("missing", {"id": "missing"}) is False
+        
+        cases = sqlite_db.get_all_cases()
+        assert [case["id"] for case in cases] == ["case-0", "case-1", "case-2"]
+        assert cases[0]["last_name"] == "Renamed"
+    
+    def test_delete_case(self, sqlite_db):
+        """Test deleting existing and unknown cases"""
+        sqlite_db.add_case(SAMPLE_CASES["complete_case"].copy())
+        
+        assert sqlite_db.delete_case("case-123") is True
+        assert sqlite_db.delete_case("case-123") is False
+        assert sqlite_db.get_all_cases() == []
+    
+    def test_search_and_filters(self, sqlite_db):
+        """Test search, status and date range queries"""
+        sqlite_db.add_case({"id": "1", "last_name": "Smith", "in_custody": True, "court_date": "2024-01-10"})
+        sqlite_db.add_case({"id": "2", "last_name": "Jones", "veteran": True, "court_date": "2024-03-01"})
+        
+        assert [c["id"] for c in sqlite_db.search_cases("SMI")] == ["1"]
+        assert [c["id"] for c in sqlite_db.get_cases_by_status("In Custody")] == ["1"]
+        assert [c["id"] for c in sqlite_db.get_cases_by_status("Veteran")] == ["2"]
+        assert sqlite_db.get_cases_by_status("Unknown") == []
+        assert [c["id"] for c in sqlite_db.get_cases_by_date_range("2024-01-01", "2024-01-31")] == ["1"]
+    
+    def test_search_substrings(self, sqlite_db):
+        """Test full-text search keeps substring matching and short terms work"""
+        sqlite_db.add_case({"id": "1", "last_name": "Smith", "first_name": "John", "case_number": "2024-CF-001"})
+        sqlite_db.add_case({"id": "2", "last_name": "Jones", "charges": "Battery"})
+        
+        assert [c["id"] for c in sqlite_db.search_cases("mith")] == ["1"]
+        assert [c["id"] for c in sqlite_db.search_cases("cf-001")] == ["1"]
+        assert [c["id"] for c in sqlite_db.search_cases("jo")] == ["1", "2"]
+        assert sqlite_db.search_cases("hjo") == []
+        assert sqlite_db.search_cases('"x') == []
+        
+        sqlite_db.update_case("2", {"id": "2", "last_name": "Brown"})
+        assert sqlite_db.search_cases("battery") == []
+        sqlite_db.delete_case("1")
+        assert sqlite_db.search_cases("smith") == []
+    
+    def test_search_index_built_for_existing_rows(self, sqlite_db):
+        """Test rows stored before the search index existed are indexed"""
+        sqlite_db.add_case({"id": "1", "last_name": "Smith"})
+        with sqlite3.connect(sqlite_db.db_path) as conn:
+            conn.executescript("DROP TABLE cases_fts; DROP TRIGGER cases_fts_insert;"
+                               "DROP TRIGGER cases_fts_delete; DROP TRIGGER cases_fts_update;")
+        
+        reopened = SQLiteCaseDatabase(str(sqlite_db.db_path))
+        assert [c["id"] for c in reopened.search_cases("smith")] == ["1"]
+    
+    def test_import_from_json(self, sqlite_db, temp_db_path):
+        """Test importing cases from a JSON database"""
+        json_db = CaseDatabase(temp_db_path)
+        json_db.add_case(SAMPLE_CASES["complete_case"].copy())
+        json_db.add_case(SAMPLE_CASES["minimal_case"].copy())
+        
+        assert sqlite_db.import_from_json(temp_db_path) == 2
+        assert sqlite_db.get_all_cases() == json_db.get_all_cases()
+    
+    def test_export_to_csv(self, sqlite_db, temp_dir):
+        """Test CSV export matches the JSON backend"""
+        sqlite_db.add_case(SAMPLE_CASES["complete_case"].copy())
+        csv_path = os.path.join(temp_dir, "export.csv")
+        sqlite_db.export_to_csv(csv_path)
+        
+        with open(csv_path) as f:
+            assert "case-123" in f.read()
+    
+    def test_version_changes(self, sqlite_db):
+        """Test the version token changes after a write"""
+        before = sqlite_db.version()
+        sqlite_db.add_case(SAMPLE_CASES["complete_case"].copy())
+        assert sqlite_db.version() != before
\ No newline at end of file
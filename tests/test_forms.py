@@ -163,6 +163,21 @@ class TestRenderCaseInfo:
                     pass  # Values would be from the existing case data
 
 
+    @patch('streamlit.text_input')
+    @patch('streamlit.text_area')
+    @patch('streamlit.selectbox')
+    @patch('streamlit.header')
+    @patch('streamlit.columns')
+    def test_render_case_info_case_type_index(self, mock_columns, mock_header, mock_selectbox, mock_text_area, mock_text_input):
+        """Test the case type selectbox picks the stored type or the default"""
+        mock_columns.side_effect = lambda spec: [MagicMock() for _ in range(spec if isinstance(spec, int) else len(spec))]
+        
+        render_case_info({"case_type": "Misdemeanor"})
+        assert mock_selectbox.call_args[1]["index"] == 1
+        
+        render_case_info({"case_type": "Unknown"})
+        assert mock_selectbox.call_args[1]["index"] == 2
+
 class TestRenderCourtInfo:
     """Test cases for court information form rendering"""
     
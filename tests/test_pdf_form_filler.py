@@ -0,0 +1,126 @@
+"""
+Unit tests for the PDF Form Filler module
+"""
+import pytest
+import os
+from datetime import date, time
+from pathlib import Path
+from unittest.mock import patch
+from PyPDF2 import PdfReader
+from modules.pdf_form_filler import fill_official_form, fill_forms_bulk
+import modules.pdf_form_filler as form_filler
+
+TEMPLATE_PATH = str(Path(__file__).parent.parent / "CASE OPENING SHEET.pdf")
+
+
+def _page_text(pdf_path):
+    """Extracted text of the first page of a PDF"""
+    return PdfReader(pdf_path).pages[0].extract_text()
+
+
+class TestFillOfficialForm:
+    """Test cases for filling the official Case Opening Sheet"""
+    
+    @pytest.fixture(autouse=True)
+    def output_dir(self, temp_dir, monkeypatch):
+        """Write exports into a temporary directory"""
+        monkeypatch.chdir(temp_dir)
+    
+    def test_fills_case_fields(self):
+        """Test the output keeps the template and adds the case data"""
+        pdf_path = fill_official_form(
+            {"last_name": "Doe", "first_name": "John", "case_number": "23CF000123"}, TEMPLATE_PATH
+        )
+        
+        text = _page_text(pdf_path)
+        assert pdf_path.startswith("exports/pdfs/Doe_John_23CF000123_official_")
+        assert "Doe" in text and "23CF000123" in text
+        assert _page_text(TEMPLATE_PATH).split()[0] in text
+    
+    def test_fields_placed_from_layout(self):
+        """Test dates are formatted, text is truncated and checkboxes are marked"""
+        case_data = {
+            "court_date": date(2024, 1, 15),
+            "court_time": time(14, 30),
+            "asa": "A" * 30,
+            "charges": "Battery\nTheft\nTrespass",
+            "mental_health_issues": True,
+        }
+        
+        drawn = set(form_filler._overlay_text(case_data))
+        assert (90, 750, "01/15/2024") in drawn and (140, 495, "01/15/2024") in drawn
+        assert (110, 475, "02:30 PM") in drawn
+        assert (90, 730, "A" * 18) in drawn
+        assert (420, 220, "Battery") in drawn and (420, 208, "Theft") in drawn
+        assert not any(text == "Trespass" for _, _, text in drawn)
+        assert (160, 315, "Issues noted") in drawn
+        # Unset Yes/No fields mark "No"
+        assert (360, 395, "X") in drawn
+    
+    def test_overlay_escapes_text(self):
+        """Test PDF string delimiters are escaped and text is WinAnsi encoded"""
+        content = form_filler._render_overlay([(100, 650, "O(Brien) \\ José"), (60, 590, "東京")])
+        
+        assert b"BT /F1 9 Tf 100 650 Td (O\\(Brien\\) \\\\ Jos\xe9) Tj" in content
+        assert b"BT /F1 9 Tf 60 590 Td (??) Tj ET" in content
+        
+        pdf_path = fill_official_form({"last_name": "O(Brien)", "first_name": "José"}, TEMPLATE_PATH)
+        text = _page_text(pdf_path)
+        assert "O(Brien)" in text and "José" in text
+    
+    def test_template_parsed_once_and_left_unchanged(self):
+        """Test the cached template is reused and earlier cases do not leak into later forms"""
+        fill_official_form({"last_name": "Firstcase"}, TEMPLATE_PATH)
+        
+        with patch('modules.pdf_form_filler.PdfReader', wraps=PdfReader) as mock_reader:
+            second = fill_official_form({"last_name": "Secondcase"}, TEMPLATE_PATH)
+            # Neither the template nor the overlay is parsed again
+            assert mock_reader.call_count == 0
+        
+        text = _page_text(second)
+        assert "Secondcase" in text
+        assert "Firstcase" not in text
+    
+    def test_template_reloaded_when_file_changes(self, temp_dir):
+        """Test an updated template file replaces the cached one"""
+        template_copy = os.path.join(temp_dir, "template.pdf")
+        with open(TEMPLATE_PATH, 'rb') as src, open(template_copy, 'wb') as dst:
+            dst.write(src.read())
+        first = form_filler._get_template(template_copy)
+        
+        os.utime(template_copy, ns=(0, 0))
+        
+        assert form_filler._get_template(template_copy) is not first
+        assert form_filler._get_template(template_copy) is form_filler._get_template(template_copy)
+    
+    def test_overlay_added_without_rewriting_template(self):
+        """Test the template's content stream is kept as is and the overlay drawn after it"""
+        pdf_path = fill_official_form({"last_name": "Doe"}, TEMPLATE_PATH)
+        
+        page = PdfReader(pdf_path).pages[0]
+        template_page = PdfReader(TEMPLATE_PATH).pages[0]
+        contents = page['/Contents']
+        assert len(contents) == 3
+        assert contents[1].get_object().get_data() == template_page.get_contents().get_data()
+        assert b"/CaseOpeningOverlay Do" in contents[2].get_object().get_data()
+        overlay = page['/Resources']['/XObject']['/CaseOpeningOverlay'].get_object()
+        assert overlay['/Subtype'] == '/Form'
+        assert b"Doe" in overlay.get_data()
+    
+    def test_fill_forms_bulk(self):
+        """Test bulk filling returns one output per case, in order"""
+        cases = [{"last_name": f"Doe{i}", "case_number": f"23CF00012{i}"} for i in range(3)]
+        
+        pdf_paths = fill_forms_bulk(cases, TEMPLATE_PATH, workers=2)
+        
+        assert len(pdf_paths) == 3
+        for i, pdf_path in enumerate(pdf_paths):
+            assert f"23CF00012{i}" in _page_text(pdf_path)
+    
+    def test_fill_forms_bulk_single_case_in_process(self):
+        """Test a single case is filled without starting worker processes"""
+        with patch('modules.pdf_form_filler.ProcessPoolExecutor') as mock_pool:
+            pdf_paths = fill_forms_bulk([{"last_name": "Doe"}], TEMPLATE_PATH)
+        
+        mock_pool.assert_not_called()
+        assert "Doe" in _page_text(pdf_paths[0])
\ No newline at end of file
@@ -3,9 +3,10 @@ Unit tests for the PDF Generator module
 """
 import pytest
 import os
+from datetime import date, time
 from unittest.mock import patch, Mock, MagicMock
 from pathlib import Path
-from modules.pdf_generator import generate_case_pdf
+from modules.pdf_generator import generate_case_pdf, generate_case_pdf_bytes
 from fixtures.sample_data import SAMPLE_CASES
 
 
@@ -249,4 +250,86 @@ class TestPDFGenerator:
             
             # Verify content elements were created
             assert mock_paragraph.called
-            mock_doc_instance.build.assert_called_once()
\ No newline at end of file
+            mock_doc_instance.build.assert_called_once()
+    
+    def test_generate_pdf_reuses_unchanged_case(self, temp_dir, monkeypatch):
+        """Test that an unchanged case reuses the previously generated PDF"""
+        monkeypatch.chdir(temp_dir)
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        
+        first = generate_case_pdf(case_data)
+        
+        case_data["updated_at"] = "2023-02-01T09:00:00"
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            second = generate_case_pdf(case_data)
+            mock_doc.assert_not_called()
+        
+        assert second == first
+        assert os.path.getsize(first) > 0
+    
+    def test_generate_pdf_rebuilds_changed_case(self, temp_dir, monkeypatch):
+        """Test that changed case content or a deleted file triggers a rebuild"""
+        monkeypatch.chdir(temp_dir)
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        first = generate_case_pdf(case_data)
+        
+        case_data["charges"] = "Reduced charges"
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            generate_case_pdf(case_data)
+            mock_doc.assert_called_once()
+        
+        os.remove(first)
+        case_data["charges"] = SAMPLE_CASES["complete_case"]["charges"]
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            generate_case_pdf(case_data)
+            mock_doc.assert_called_once()
+    
+    def test_generate_pdf_bytes_in_memory(self, temp_dir, monkeypatch):
+        """Test in-memory generation returns PDF bytes without writing a file"""
+        monkeypatch.chdir(temp_dir)
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        
+        name, pdf_bytes = generate_case_pdf_bytes(case_data)
+        
+        assert pdf_bytes.startswith(b"%PDF")
+        assert name.startswith("Doe_John_23CF000123_") and name.endswith(".pdf")
+        assert not os.path.exists(os.path.join(temp_dir, "exports"))
+        
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            assert generate_case_pdf_bytes(case_data) == (name, pdf_bytes)
+            mock_doc.assert_not_called()
+    
+    def test_generate_pdf_formats_dates(self):
+        """Test date and time objects are shown in display format, including the header"""
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        case_data.update(court_date=date(2024, 1, 15), applied_date=date(2024, 1, 2), court_time=time(14, 30))
+        
+        with patch('modules.pdf_generator.SimpleDocTemplate'), \
+             patch('modules.pdf_generator.Table') as mock_table, \
+             patch('modules.pdf_generator.Paragraph') as mock_paragraph:
+            generate_case_pdf_bytes(case_data)
+        
+        header_rows = mock_table.call_args_list[0][0][0]
+        assert header_rows[0][1] == "01/15/2024"
+        assert header_rows[1][1] == "01/02/2024"
+        texts = " ".join(str(c[0][0]) for c in mock_paragraph.call_args_list)
+        assert "Court Date: 01/15/2024" in texts
+        assert "Time: 02:30 PM" in texts
+    
+    def test_date_object_and_string_not_cached_together(self, temp_dir, monkeypatch):
+        """Test a date object and its ISO string, which print differently, get separate PDFs"""
+        monkeypatch.chdir(temp_dir)
+        case_data = SAMPLE_CASES["complete_case"].copy()
+        case_data["court_date"] = date(2024, 1, 5)
+        name, pdf_bytes = generate_case_pdf_bytes(case_data)
+        
+        case_data["court_date"] = "2024-01-05"
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            generate_case_pdf_bytes(case_data)
+            mock_doc.assert_called_once()
+        
+        # The same date given as an object again is still served from the cache
+        case_data["court_date"] = date(2024, 1, 5)
+        with patch('modules.pdf_generator.SimpleDocTemplate') as mock_doc:
+            assert generate_case_pdf_bytes(case_data) == (name, pdf_bytes)
+            mock_doc.assert_not_called()
\ No newline at end of file
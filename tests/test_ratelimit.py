@@ -0,0 +1,71 @@
+"""
+Unit tests for the rate limiting module
+"""
+import pytest
+from unittest.mock import patch
+from modules.ratelimit import SlidingWindow
+
+
+class TestSlidingWindow:
+    """Test cases for the SlidingWindow rate limiter"""
+    
+    @pytest.fixture
+    def clock(self):
+        """Controllable time.monotonic"""
+        with patch('modules.ratelimit.time.monotonic', return_value=1000.0) as mock_clock:
+            yield mock_clock
+    
+    def test_allows_up_to_limit(self, clock):
+        """Test calls are allowed until the limit is reached"""
+        limiter = SlidingWindow(3, 300)
+        
+        assert [limiter.allow("a@pd15.org") for _ in range(4)] == [True, True, True, False]
+        assert limiter.allow("b@pd15.org") is True
+    
+    def test_window_slides(self, clock):
+        """Test calls become available again as old ones leave the window"""
+        limiter = SlidingWindow(2, 60)
+        limiter.allow("a")
+        clock.return_value = 1030.0
+        limiter.allow("a")
+        
+        clock.return_value = 1045.0
+        assert limiter.retry_after("a") == pytest.approx(15.0)
+        
+        clock.return_value = 1060.0
+        assert limiter.allow("a") is True
+        assert limiter.allow("a") is False
+    
+    def test_rejected_calls_not_counted(self, clock):
+        """Test a denied call does not extend the wait"""
+        limiter = SlidingWindow(1, 60)
+        limiter.allow("a")
+        for _ in range(5):
+            assert limiter.allow("a") is False
+        
+        clock.return_value = 1060.0
+        assert limiter.allow("a") is True
+    
+    def test_reset_clears_key(self, clock):
+        """Test a reset key starts over while other keys keep their calls"""
+        limiter = SlidingWindow(1, 60)
+        limiter.allow("a")
+        limiter.allow("b")
+        
+        limiter.reset("a")
+        limiter.reset("missing")
+        
+        assert limiter.allow("a") is True
+        assert limiter.allow("b") is False
+    
+    def test_idle_keys_dropped(self, clock):
+        """Test keys with no recent calls are forgotten once many are tracked"""
+        limiter = SlidingWindow(1, 60)
+        limiter.MAX_IDLE_KEYS = 3
+        for key in ("a", "b", "c"):
+            limiter.allow(key)
+        
+        clock.return_value = 1100.0
+        limiter.allow("d")
+        
+        assert list(limiter._calls) == ["d"]
\ No newline at end of file
@@ -7,7 +7,8 @@ import json
 import base64
 from unittest.mock import Mock, patch, mock_open, MagicMock
 from cryptography.fernet import Fernet
-from modules.secure_credentials import SecureCredentialManager
+from modules.secure_credentials import SecureCredentialManager, PBKDF2HMAC
+import modules.secure_credentials as secure_credentials
 
 
 class TestSecureCredentialManager:
@@ -52,6 +53,16 @@ class TestSecureCredentialManager:
         result = manager._is_authorized_user('random@pd15.org')
         assert result is False
     
+    def test_is_authorized_user_constant_time(self):
+        """Test every authorized email is compared with compare_digest, including non-ASCII input"""
+        manager = SecureCredentialManager()
+        
+        with patch('modules.secure_credentials.hmac.compare_digest', wraps=secure_credentials.hmac.compare_digest) as mock_compare:
+            assert manager._is_authorized_user('Dkarpay@pd15.org') is True
+            assert manager._is_authorized_user('jos\u00e9@pd15.org') is False
+        
+        assert mock_compare.call_count == 2 * len(manager.authorized_users)
+    
     def test_derive_key_from_password(self):
         """Test key derivation from password"""
         manager = SecureCredentialManager()
@@ -375,4 +386,133 @@ class TestSecureCredentialManagerIntegration:
         
         new_result = manager.get_credentials('dkarpay@pd15.org', 'password2')
         assert new_result[0] is True
-        assert new_result[1]['smtp_username'] == 'smtp2@example.com'
\ No newline at end of file
+        assert new_result[1]['smtp_username'] == 'smtp2@example.com'
+    
+    def test_derived_key_cached_after_unlock(self, temp_dir):
+        """Test a working master password is derived once and the cache can be cleared"""
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'master_password', 'smtp@example.com', 'smtp_secret')
+        SecureCredentialManager.clear_key_cache()
+        
+        with patch('modules.secure_credentials.PBKDF2HMAC', wraps=PBKDF2HMAC) as mock_kdf:
+            assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            assert mock_kdf.call_count == 1
+            
+            # Wrong passwords are derived every time and never cached
+            manager.get_credentials('dkarpay@pd15.org', 'wrong_password')
+            manager.get_credentials('dkarpay@pd15.org', 'wrong_password')
+            assert mock_kdf.call_count == 3
+            assert len(secure_credentials._session_key_cache()) == 1
+            
+            SecureCredentialManager.clear_key_cache()
+            assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            assert mock_kdf.call_count == 4
+    
+    def test_derived_keys_cached_per_session(self, temp_dir):
+        """Test each session derives its own key and clearing one session leaves the others"""
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'master_password', 'smtp@example.com', 'smtp_secret')
+        admin_session, other_session = {}, {}
+        
+        with patch('modules.secure_credentials.PBKDF2HMAC', wraps=PBKDF2HMAC) as mock_kdf:
+            with patch('modules.secure_credentials.st.session_state', admin_session):
+                assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            with patch('modules.secure_credentials.st.session_state', other_session):
+                SecureCredentialManager.clear_key_cache()
+            with patch('modules.secure_credentials.st.session_state', admin_session):
+                assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            assert mock_kdf.call_count == 1
+        
+        assert other_session == {}
+    
+    def test_kdf_settings_stored_with_credentials(self, temp_dir, monkeypatch):
+        """Test the configured KDF is recorded in the file and used to decrypt it"""
+        monkeypatch.setenv('CRED_KDF_ITER', '1000')
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'master_password', 'smtp@example.com', 'smtp_secret')
+        SecureCredentialManager.clear_key_cache()
+        
+        with open(manager.credentials_file) as f:
+            assert json.load(f)['kdf'] == {'algo': 'pbkdf2-sha256', 'iter': 1000}
+        
+        # A later change of settings does not affect existing files
+        monkeypatch.setenv('CRED_KDF_ITER', '2000')
+        assert SecureCredentialManager().kdf['iter'] == 2000
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[2] == 'smtp@example.com'
+    
+    def test_legacy_file_without_kdf_decrypts(self, temp_dir):
+        """Test files written before KDF settings were stored use 100,000 PBKDF2 iterations"""
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        salt = b'legacy_salt_16by'
+        key = manager._derive_key_from_password('master_password', salt, secure_credentials.LEGACY_KDF)
+        encrypted = Fernet(key).encrypt(json.dumps({'smtp_username': 'old@example.com', 'smtp_password': 'old'}).encode())
+        with open(manager.credentials_file, 'w') as f:
+            json.dump({
+                'salt': base64.b64encode(salt).decode(),
+                'encrypted_credentials': base64.b64encode(encrypted).decode(),
+                'authorized_users': manager.authorized_users,
+            }, f)
+        SecureCredentialManager.clear_key_cache()
+        
+        assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[2] == 'old@example.com'
+    
+    def test_argon2id_credentials(self, temp_dir, monkeypatch):
+        """Test credentials can be protected with Argon2id"""
+        if secure_credentials.Argon2id is None:
+            pytest.skip("Argon2id needs cryptography 44 or newer")
+        monkeypatch.setenv('CRED_KDF', 'argon2id')
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'master_password', 'smtp@example.com', 'smtp_secret')
+        SecureCredentialManager.clear_key_cache()
+        
+        with open(manager.credentials_file) as f:
+            assert json.load(f)['kdf']['algo'] == 'argon2id'
+        assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[2] == 'smtp@example.com'
+        assert manager.get_credentials('dkarpay@pd15.org', 'wrong_password')[0] is False
+    
+    def test_credentials_file_parsed_once(self, temp_dir, monkeypatch):
+        """Test the stored file is re-read only after it changes"""
+        monkeypatch.setenv('CRED_KDF_ITER', '1000')
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'password1', 'smtp1@example.com', 'secret1')
+        manager.get_credentials('dkarpay@pd15.org', 'password1')
+        
+        with patch('builtins.open', wraps=open) as mock_file:
+            assert manager.get_credentials('dkarpay@pd15.org', 'password1')[2] == 'smtp1@example.com'
+            assert mock_file.call_count == 0
+            
+            manager.setup_credentials('dkarpay@pd15.org', 'password2', 'smtp2@example.com', 'secret2')
+            assert manager.get_credentials('dkarpay@pd15.org', 'password2')[2] == 'smtp2@example.com'
+            # One write by setup and one read after it
+            assert mock_file.call_count == 2
+    
+    def test_stored_authorized_users_checked_only_when_changed(self, temp_dir, monkeypatch):
+        """Test the stored user list is compared only when it differs from the manager's"""
+        monkeypatch.setenv('CRED_KDF_ITER', '1000')
+        manager = SecureCredentialManager()
+        manager.credentials_file = os.path.join(temp_dir, 'test_credentials.enc')
+        manager.setup_credentials('dkarpay@pd15.org', 'master_password', 'smtp@example.com', 'smtp_secret')
+        
+        with patch('modules.secure_credentials.hmac.compare_digest', wraps=secure_credentials.hmac.compare_digest) as mock_compare:
+            assert manager.get_credentials('dkarpay@pd15.org', 'master_password')[0] is True
+            assert mock_compare.call_count == len(manager.authorized_users)
+        
+        # A user removed from the stored list is refused
+        with open(manager.credentials_file) as f:
+            storage_data = json.load(f)
+        storage_data['authorized_users'] = ['someone@pd15.org']
+        with open(manager.credentials_file, 'w') as f:
+            json.dump(storage_data, f)
+        
+        result = manager.get_credentials('dkarpay@pd15.org', 'master_password')
+        assert result[0] is False
+        assert "no longer authorized" in result[1]
\ No newline at end of file
@@ -2,8 +2,9 @@
 Unit tests for the Utils module
 """
 import pytest
-from datetime import date, datetime
-from modules.utils import format_phone, parse_date, format_date
+from datetime import date, datetime, time
+from unittest.mock import patch
+from modules.utils import format_phone, parse_date, parse_iso_date, format_date, format_time, sanitize_filename, calculate_age, export_statistics, json_dumps, json_loads
 from fixtures.sample_data import PHONE_TEST_CASES, DATE_TEST_CASES
 
 
@@ -46,6 +47,11 @@ class TestFormatPhone:
         result = format_phone("15551234567")
         assert result == "15551234567"  # Should return as-is
     
+    def test_format_phone_non_ascii(self):
+        """Test non-ASCII separators and digits are handled like before"""
+        assert format_phone("555\u2013123\u20134567") == "(555) 123-4567"
+        assert format_phone("\uff15\uff15\uff151234567") == "(\uff15\uff15\uff15) 123-4567"
+    
     def test_format_phone_too_short(self):
         """Test formatting phone that's too short"""
         result = format_phone("123")
@@ -131,12 +137,34 @@ class TestParseDate:
         result = parse_date("2024-02-29")  # 2024 is a leap year
         assert result == date(2024, 2, 29)
     
+    def test_parse_date_unpadded_and_mixed_separators(self):
+        """Test unpadded dates still parse and mixed separators do not"""
+        assert parse_date("2023-1-5") == date(2023, 1, 5)
+        assert parse_date("1/5/2023") == date(2023, 1, 5)
+        assert parse_date("2023-01/15") is None
+        assert parse_date("20230115") is None
+    
     def test_parse_date_february_29_non_leap_year(self):
         """Test parsing February 29 in non-leap year"""
         result = parse_date("2023-02-29")  # 2023 is not a leap year
         assert result is None
 
 
+class TestParseIsoDate:
+    """Test cases for cached ISO date parsing"""
+    
+    def test_parse_iso_date(self):
+        """Test parsing stored ISO dates and datetimes"""
+        assert parse_iso_date("2024-01-15") == date(2024, 1, 15)
+        assert parse_iso_date("2024-01-15T10:30:00") == date(2024, 1, 15)
+    
+    def test_parse_iso_date_invalid(self):
+        """Test invalid strings return None"""
+        assert parse_iso_date("") is None
+        assert parse_iso_date("01/15/2024") is None
+        assert parse_iso_date("not-a-date") is None
+
+
 class TestFormatDate:
     """Test cases for date formatting"""
     
@@ -193,6 +221,115 @@ class TestFormatDate:
         assert result == ""
 
 
+class TestFormatTime:
+    """Test cases for time formatting"""
+    
+    def test_format_time_matches_strftime(self):
+        """Test output matches strftime('%I:%M %p') around midnight and noon"""
+        for value in (time(0, 5), time(9, 30), time(12, 0), time(14, 30), time(23, 59)):
+            assert format_time(value) == value.strftime('%I:%M %p')
+        assert format_time(datetime(2024, 1, 15, 14, 30)) == "02:30 PM"
+    
+    def test_format_time_string_passthrough(self):
+        """Test strings are returned as-is"""
+        assert format_time("2:30 PM") == "2:30 PM"
+        assert format_time("") == ""
+
+
+class TestSanitizeFilename:
+    """Test cases for filename sanitizing"""
+    
+    def test_sanitize_filename_invalid_chars(self):
+        """Test every invalid character becomes a single underscore"""
+        assert sanitize_filename('a<b>c:d"e/f\\g|h?i*j') == "a_b_c_d_e_f_g_h_i_j"
+        assert sanitize_filename("Doe, John 23/CF//0001") == "Doe, John 23_CF_0001"
+    
+    def test_sanitize_filename_trims(self):
+        """Test leading/trailing underscores are stripped and length is capped"""
+        assert sanitize_filename("/case/") == "case"
+        assert len(sanitize_filename("x" * 150)) == 100
+
+
+class TestCalculateAge:
+    """Test cases for age calculation"""
+    
+    class FixedDate(date):
+        """date with a fixed today()"""
+        @classmethod
+        def today(cls):
+            return cls(2024, 6, 15)
+    
+    @pytest.mark.parametrize("birth_date,expected", [
+        (date(1990, 6, 15), 34),
+        (date(1990, 6, 16), 33),
+        (date(1990, 5, 31), 34),
+        (date(1990, 7, 1), 33),
+        (datetime(1990, 6, 14, 23, 59), 34),
+        (None, 0),
+    ])
+    def test_calculate_age(self, birth_date, expected):
+        """Test ages around the birthday boundary"""
+        with patch('modules.utils.date', self.FixedDate):
+            assert calculate_age(birth_date) == expected
+
+
+class TestExportStatistics:
+    """Test cases for case statistics"""
+    
+    def test_export_statistics(self):
+        """Test flag counts and histograms with defaults for missing fields"""
+        cases = [
+            {"in_custody": True, "veteran": True, "case_type": "Felony", "attorney": "Smith", "division": "A"},
+            {"on_probation": True, "pending_charges": True, "case_type": "Felony", "division": "B"},
+            {"mental_health_issues": True, "in_custody": False},
+        ]
+        
+        assert export_statistics(cases) == {
+            'total_cases': 3,
+            'in_custody': 1,
+            'on_probation': 1,
+            'veterans': 1,
+            'mental_health': 1,
+            'pending_charges': 1,
+            'case_types': {'Felony': 2, 'Unknown': 1},
+            'attorneys': {'Smith': 1, 'Unassigned': 2},
+            'divisions': {'A': 1, 'B': 1, 'Unknown': 1}
+        }
+    
+    def test_export_statistics_empty(self):
+        """Test statistics for no cases"""
+        stats = export_statistics([])
+        
+        assert stats['total_cases'] == 0
+        assert stats['case_types'] == {}
+
+
+class TestJsonHelpers:
+    """Test cases for JSON serialization helpers"""
+    
+    def test_json_roundtrip(self):
+        """Test that data survives a dumps/loads roundtrip"""
+        data = {"id": "case-123", "charges": "Battery", "in_custody": True}
+        assert json_loads(json_dumps(data)) == data
+        assert json_loads(json_dumps(data, indent=True)) == data
+    
+    def test_json_dumps_dates(self):
+        """Test that dates and datetimes are written as ISO strings"""
+        data = {"dob": date(1990, 1, 15), "created_at": datetime(2023, 1, 1, 12, 0, 0)}
+        assert json_loads(json_dumps(data)) == {
+            "dob": "1990-01-15",
+            "created_at": "2023-01-01T12:00:00"
+        }
+    
+    def test_json_stdlib_fallback(self):
+        """Test that the helpers work without orjson installed"""
+        data = {"dob": date(1990, 1, 15), "name": "José"}
+        with patch('modules.utils.orjson', None):
+            encoded = json_dumps(data, indent=True)
+            assert isinstance(encoded, bytes)
+            assert json_loads(encoded) == {"dob": "1990-01-15", "name": "José"}
+
+
 class TestUtilsIntegration:
     """Integration tests for utility functions"""
     